@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Drives behaviour trees from an asyncio event loop, so that side work
+such as input handling, metrics export or log flushing can run as
+concurrent tasks in between ticks rather than inside tick handlers.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import asyncio
+import time
+
+from .instrumentation import TickLatencyHistogram
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class RealtimeRateProxy(object):
+    """
+    Stands in for the runner of a behaviour tree driven by an
+    AsyncTickTock, handing realtime rate requests over to the driver
+    rather than to the runner, which is left running as fast as possible.
+    Everything else goes to the runner.
+
+    Args:
+        runner: the simulation runner
+        driver: the AsyncTickTock pacing it
+    """
+
+    def __init__(self, runner, driver):
+        self._runner = runner
+        self._driver = driver
+
+    def __getattr__(self, name):
+        return getattr(self._runner, name)
+
+    def get_realtime_rate(self):
+        """Realtime rate the driver paces the simulation at."""
+        return self._driver.realtime_rate
+
+    def set_realtime_rate(self, realtime_rate):
+        """Have the driver pace the simulation at another realtime rate."""
+        self._driver.realtime_rate = realtime_rate
+
+
+class AsyncTickTock(object):
+    """
+    Ticks a behaviour tree and steps its simulation as a coroutine,
+    yielding to the event loop after every tick. Wall clock pacing is
+    done by the driver, sleeping on the event loop for as long as the
+    simulation runs ahead of the realtime rate, so the runner itself is
+    set to run as fast as possible. While running, the tree's runner is
+    replaced by a RealtimeRateProxy, so that tick handlers changing the
+    realtime rate change the driver's. While the simulation is paused,
+    the tree is not ticked.
+
+    Args:
+        simulation_tree: a behaviour tree that has already been setup
+        period: behaviour tree tick period (s)
+        realtime_rate: ratio of sim vs real time, zero to run as fast as
+                       possible, the runner's own if None
+    """
+
+    def __init__(self, simulation_tree, period, realtime_rate=None):
+        self.simulation_tree = simulation_tree
+        self.period = period
+        self.runner = simulation_tree.runner
+        self.realtime_rate = self.runner.get_realtime_rate() if realtime_rate is None \
+            else realtime_rate
+        self.ticks = 0
+        self.tick_latencies = TickLatencyHistogram()
+
+    async def run(self, number_of_iterations=-1):
+        """
+        Tick the tree until interrupted or, if given, for a number of ticks.
+        Args:
+            number_of_iterations: number of ticks, endless if negative
+        """
+        runner = self.runner
+        runner.set_realtime_rate(0.)
+        self.simulation_tree.runner = RealtimeRateProxy(runner, self)
+        try:
+            await self._run(runner, number_of_iterations)
+        finally:
+            self.simulation_tree.runner = runner
+            runner.set_realtime_rate(self.realtime_rate)
+
+    async def _run(self, runner, number_of_iterations):
+        deadline = time.perf_counter()
+        iteration = 0
+        while not self.simulation_tree.interrupt_tick_tocking and (
+                number_of_iterations < 0 or iteration < number_of_iterations):
+            if runner.is_simulation_paused():
+                await asyncio.sleep(self.period)
+                deadline = time.perf_counter()
+                continue
+            if runner.get_realtime_rate() > 0.:
+                # Requested straight from the runner, e.g. by the visualizer.
+                self.realtime_rate = runner.get_realtime_rate()
+                runner.set_realtime_rate(0.)
+            tick_start = time.perf_counter_ns()
+            self.simulation_tree.tick()
+            runner.run_sync_for(self.period)
+            self.tick_latencies.record(time.perf_counter_ns() - tick_start)
+            self.ticks += 1
+            iteration += 1
+            if self.realtime_rate > 0.:
+                deadline += self.period / self.realtime_rate
+                now = time.perf_counter()
+                # Falling behind, do not try to catch up in a burst.
+                if deadline < now - self.period:
+                    deadline = now
+                await asyncio.sleep(max(deadline - now, 0.))
+            else:
+                await asyncio.sleep(0)
+
+
+async def every(interval, callback):
+    """
+    Call a function periodically, in wall time, until cancelled.
+    Args:
+        interval: time in between calls (s)
+        callback: a callable taking no arguments
+    """
+    while True:
+        await asyncio.sleep(interval)
+        callback()
+
+
+async def run_concurrently(driver, number_of_iterations=-1, tasks=()):
+    """
+    Run a tick loop along with side tasks, which are cancelled once
+    the loop is over.
+    Args:
+        driver: an AsyncTickTock
+        number_of_iterations: number of ticks, endless if negative
+        tasks: coroutines to run along
+    """
+    side_tasks = [asyncio.ensure_future(task) for task in tasks]
+    try:
+        await driver.run(number_of_iterations)
+    finally:
+        for task in side_tasks:
+            task.cancel()
+        await asyncio.gather(*side_tasks, return_exceptions=True)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Behaviours that drive the agents of a scenario.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import py_trees.behaviour
+import py_trees.common
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class DelayedChangeSpeed(py_trees.behaviour.Behaviour):
+    """
+    Change speed of agent after 10 seconds have passed in simulation.
+    """
+
+    def __init__(self, agent_name, speed=1.0,
+                 name=py_trees.common.Name.AUTO_GENERATED):
+        super().__init__(name)
+        self.speed = speed
+        self.agent_name = agent_name
+
+    def initialise(self):
+        self.status = py_trees.common.Status.RUNNING
+
+    def late_setup(self, simulation):
+        self.simulation = simulation
+        self.agent = simulation.get_agent_by_name(self.agent_name)
+
+    def update(self):
+        if self.simulation.get_current_time() >= 10.0:
+            print("Speed up!")
+            self.agent.set_speed(self.speed)
+            self.status = py_trees.common.Status.SUCCESS
+        return self.status
+
+
+class KeyopAccelerateSteerUnicycleCar(py_trees.behaviour.Behaviour):
+    """A class for operating the UnicycleCar agent via keyboard commands.
+    """
+
+    def __init__(self, agent_name, keyboard_handler, name=py_trees.common.Name.AUTO_GENERATED):
+        super().__init__(name)
+        self.keyboard_handler = keyboard_handler
+        self.acceleration = 0.0
+        self.angular_rate = 0.0
+        self.agent_name = agent_name
+
+    def initialise(self):
+        self.status = py_trees.common.Status.RUNNING
+
+    def late_setup(self, simulation):
+        self.simulation = simulation
+        self.agent = simulation.get_agent_by_name(self.agent_name)
+        self.agent.set_acceleration(self.acceleration)
+        self.agent.set_angular_rate(self.angular_rate)
+
+    def update(self):
+        if self.keyboard_handler.key_hit():
+            key = self.keyboard_handler.get_character().lower()
+            if key == 'i':
+                print("Accelerate!")
+                self.acceleration += 0.1
+            if key == 'k':
+                print("Decelerate!")
+                self.acceleration -= 0.1
+            if key == 'j':
+                print("Steer Left!")
+                self.angular_rate += 0.01
+            if key == 'l':
+                print("Steer Right!")
+                self.angular_rate -= 0.01
+        self.agent.set_acceleration(self.acceleration)
+        self.agent.set_angular_rate(self.angular_rate)
+        self.status = py_trees.common.Status.SUCCESS
+        return self.status
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Behaviours that record the state of a scenario, see demos.recording.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import json
+import math
+import os
+import queue
+import threading
+
+import py_trees.behaviour
+import py_trees.common
+
+from .. import recording
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class AgentStateRecorder(py_trees.behaviour.Behaviour):
+    """
+    Samples the pose, velocity and, optionally, lane of a set of agents
+    at a fixed rate of simulation time into preallocated columnar chunks.
+    Full chunks are handed to a background thread that appends them to
+    the recording and hands them back for reuse. Should the writer fall
+    behind, more chunks are allocated up to a limit, past which samples
+    are dropped, and counted, until it catches up. Add it as a child of
+    the scenario subtree, and close it once the simulation is over.
+
+    Args:
+        path: directory to record to, created if need be
+        agent_names: names of the agents to record
+        rate: samples per second of simulation time
+        chunk_size: samples per chunk
+        num_chunks: chunks to preallocate, more absorb slower writes
+        max_chunks: chunks to allocate at most, including preallocated ones
+        record_lanes: whether to record the lane each agent is on,
+                      at the cost of a road geometry query per agent
+        compression: codec to compress chunks with (see get_codec()),
+                     None to store them raw and memory mappable
+    """
+
+    def __init__(self, path, agent_names, rate=10., chunk_size=256, num_chunks=4, max_chunks=16,
+                 record_lanes=False, compression=None,
+                 name=py_trees.common.Name.AUTO_GENERATED):
+        super().__init__(name)
+        self.path = path
+        self.agent_names = list(agent_names)
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.num_chunks = num_chunks
+        self.max_chunks = max(max_chunks, num_chunks)
+        self.record_lanes = record_lanes
+        self.codec = recording.get_codec(compression) if compression else None
+        self.num_samples = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.max_queue_depth = 0
+        self.dropped_samples = 0
+        self._num_allocated_chunks = 0
+        self._frames = []
+        self.lanes = []
+        self._lane_indices = {}
+        self._road_geometry = None
+        self._next_sample = 0
+        self._chunk = None
+        self._count = 0
+        self._free_chunks = queue.SimpleQueue()
+        self._pending_chunks = queue.SimpleQueue()
+        self._writer = None
+
+    def columns(self):
+        """
+        Describe the columns of the recording.
+        Returns:
+            list: (name, dtype, per sample shape) tuples
+        """
+        num_agents = len(self.agent_names)
+        columns = [('time', '<f8', ())]
+        columns.extend(
+            (name, dtype, (num_agents,) + shape) for name, dtype, shape in recording.AGENT_COLUMNS
+        )
+        if self.record_lanes:
+            columns.append(('lane', '<i4', (num_agents,)))
+        return columns
+
+    def _allocate_chunk(self):
+        import numpy as np
+
+        self._num_allocated_chunks += 1
+        return {
+            name: np.empty((self.chunk_size,) + shape, dtype=dtype)
+            for name, dtype, shape in self.columns()
+        }
+
+    def setup(self, *, builder):
+        if self.record_lanes:
+            self._road_geometry = builder.get_road_geometry()
+
+    def late_setup(self, simulation):
+        self.simulation = simulation
+        self.agents = [simulation.get_agent_by_name(name) for name in self.agent_names]
+        os.makedirs(self.path, exist_ok=True)
+        for name, _, _ in self.columns():
+            open(os.path.join(self.path, name + '.bin'), 'wb').close()
+        for _ in range(self.num_chunks - 1):
+            self._free_chunks.put(self._allocate_chunk())
+        self._chunk = self._allocate_chunk()
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def initialise(self):
+        self.status = py_trees.common.Status.RUNNING
+
+    def _lane_index(self, position):
+        import delphyne.maliput as maliput
+
+        result = self._road_geometry.ToRoadPosition(maliput.InertialPosition(*position))
+        if result.distance > recording.OFF_ROAD_DISTANCE:
+            return -1
+        lane_id = result.road_position.lane.id().string()
+        index = self._lane_indices.get(lane_id)
+        if index is None:
+            index = self._lane_indices[lane_id] = len(self.lanes)
+            self.lanes.append(lane_id)
+        return index
+
+    def update(self):
+        current_time = self.simulation.get_current_time()
+        # Keeps to a grid of sample times, tolerating round-off.
+        sample = math.floor(current_time * self.rate + 1e-6)
+        if sample < self._next_sample:
+            return self.status
+        self._next_sample = sample + 1
+        if self._chunk is None:
+            self._chunk = self._next_chunk()
+            if self._chunk is None:
+                if not self.dropped_samples:
+                    print("Agent state recorder writer fell behind, dropping samples "
+                          "until it catches up.")
+                self.dropped_samples += 1
+                return self.status
+        row = self._count
+        chunk = self._chunk
+        chunk['time'][row] = current_time
+        position, rotation, velocity = chunk['position'], chunk['rotation'], chunk['velocity']
+        for k, agent in enumerate(self.agents):
+            position[row, k] = agent.get_pose_translation()
+            rotation[row, k] = agent.get_pose_rotation()
+            velocity[row, k] = agent.get_velocity()
+        if self.record_lanes:
+            for k in range(len(self.agents)):
+                chunk['lane'][row, k] = self._lane_index(position[row, k])
+        self._count += 1
+        if self._count == self.chunk_size:
+            self.flush()
+        return self.status
+
+    def flush(self):
+        """Hand the samples taken so far over to the writer thread."""
+        if not self._count:
+            return
+        self._pending_chunks.put((self._chunk, self._count, list(self.lanes)))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth())
+        self._chunk = self._next_chunk()
+        self._count = 0
+
+    def _next_chunk(self):
+        try:
+            return self._free_chunks.get_nowait()
+        except queue.Empty:
+            pass
+        # The writer fell behind, rather than waiting for it.
+        if self._num_allocated_chunks < self.max_chunks:
+            return self._allocate_chunk()
+        return None
+
+    def queue_depth(self):
+        """Number of chunks waiting for the writer thread."""
+        return self._pending_chunks.qsize()
+
+    def _write_manifest(self, num_samples, lanes):
+        manifest = {
+            'rate': self.rate,
+            'num_samples': num_samples,
+            'agents': self.agent_names,
+            'lanes': lanes,
+            'columns': {
+                name: {'file': name + '.bin', 'dtype': dtype, 'shape': list(shape)}
+                for name, dtype, shape in self.columns()
+            },
+        }
+        if self.codec is not None:
+            manifest['compression'] = self.codec.name
+            manifest['chunks'] = self._frames
+        manifest_path = os.path.join(self.path, recording.MANIFEST)
+        with open(manifest_path + '.tmp', 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def _write_chunk(self, column_files, chunk, count):
+        frames = {'num_samples': count}
+        for name, column in chunk.items():
+            data = column[:count].tobytes()
+            if self.codec is not None:
+                data = self.codec.compress(data)
+                frames[name] = [column_files[name].tell(), len(data)]
+            column_files[name].write(data)
+            column_files[name].flush()
+            self.raw_bytes += column[:count].nbytes
+            self.stored_bytes += len(data)
+        self._frames.append(frames)
+
+    def _write(self):
+        column_files = {
+            name: open(os.path.join(self.path, name + '.bin'), 'ab')
+            for name, _, _ in self.columns()
+        }
+        num_samples = 0
+        while True:
+            item = self._pending_chunks.get()
+            if item is None:
+                break
+            chunk, count, lanes = item
+            self._write_chunk(column_files, chunk, count)
+            num_samples += count
+            self._write_manifest(num_samples, lanes)
+            self.num_samples = num_samples
+            self._free_chunks.put(chunk)
+        for column_file in column_files.values():
+            column_file.close()
+
+    def close(self):
+        """Write all samples taken and stop the writer thread."""
+        if self._writer is None:
+            return
+        self.flush()
+        self._pending_chunks.put(None)
+        self._writer.join()
+        self._writer = None
+        if not self.num_samples:
+            self._write_manifest(0, list(self.lanes))
+
+    def print_stats(self):
+        """Print how much was recorded, and how well the writer kept up."""
+        print("Recorded {} samples of {} agents: {:.1f} MiB, {:.1f} MiB stored "
+              "({:.2f}x compression), writer queue depth peaked at {} chunks".format(
+                  self.num_samples, len(self.agent_names), self.raw_bytes / 2**20,
+                  self.stored_bytes / 2**20,
+                  self.raw_bytes / self.stored_bytes if self.stored_bytes else 1.,
+                  self.max_queue_depth))
+        if self.dropped_samples:
+            print("Dropped {} samples while the writer was behind.".format(
+                self.dropped_samples))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Behaviours that work on the road of a scenario rather than on its agents.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import os
+
+import py_trees.behaviour
+import py_trees.common
+
+from .. import road_cache
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class RoadCacheProbe(py_trees.behaviour.Behaviour):
+    """
+    Provides the lane table of the road of the scenario it belongs to,
+    looking it up in a road_cache.RoadCache and storing it there on a
+    miss, so that warm starts skip walking the road geometry. Hand its
+    `lane_table` over to whatever places agents on the road (e.g.
+    spawning.SpawnAllocator), and add it as a child of the road
+    behaviour. The lane table is then available as `lanes` once the
+    simulation is set up. With no cache, the road geometry is always
+    walked.
+    """
+
+    def __init__(self, cache, file_path, yaml_file_path,
+                 linear_tolerance, angular_tolerance, *extra,
+                 name=py_trees.common.Name.AUTO_GENERATED):
+        super().__init__(name)
+        self.cache = cache
+        self.metadata = {
+            'file_path': os.path.abspath(file_path),
+            'yaml_file_path': os.path.abspath(yaml_file_path) if yaml_file_path else '',
+            'linear_tolerance': float(linear_tolerance),
+            'angular_tolerance': float(angular_tolerance),
+            'extra': [str(value) for value in extra],
+        }
+        self._key_args = (file_path, yaml_file_path, linear_tolerance, angular_tolerance) + extra
+        self.hit = False
+        self.lanes = None
+
+    def lane_table(self, road_geometry):
+        """
+        Get the lane table of the road, see road_cache.describe_road_geometry().
+        It is looked up once, by whoever asks first, agents being set up
+        or this behaviour.
+        Args:
+            road_geometry: the road geometry being simulated
+        Returns:
+            list: [lane id, lane length] pairs for every lane
+        """
+        if self.lanes is not None:
+            return self.lanes
+        if self.cache is None:
+            # Hashing the road files is only worth it to look them up.
+            self.lanes = road_cache.describe_road_geometry(road_geometry)
+            return self.lanes
+        key = road_cache.road_cache_key(*self._key_args)
+        entry = self.cache.get(key)
+        self.hit = entry is not None
+        if self.hit:
+            self.lanes = entry['lanes']
+            return self.lanes
+        self.lanes = road_cache.describe_road_geometry(road_geometry)
+        self.cache.put(key, dict(self.metadata, lanes=self.lanes))
+        return self.lanes
+
+    def setup(self, *, builder):
+        self.lane_table(builder.get_road_geometry())
+
+    def update(self):
+        return py_trees.common.Status.RUNNING
+
+    def print_summary(self):
+        """Print a summary of the road description."""
+        print("Road cache {}: {} lanes, {:.1f}m of lanes in total.".format(
+            'hit' if self.hit else 'miss', len(self.lanes),
+            sum(length for _, length in self.lanes)))
+
+
+class PreloadedRoad(py_trees.behaviour.Behaviour):
+    """
+    Hands a road loaded ahead of time (see fork_variants.preload_road()) over to the
+    simulation builder when the simulation is set up. Add it as the first
+    child of a bare road behaviour, ahead of the agents. The road network
+    is handed over for good, so a preloaded road serves one simulation.
+    """
+
+    def __init__(self, calls, name=py_trees.common.Name.AUTO_GENERATED):
+        super().__init__(name)
+        self.calls = calls
+
+    def setup(self, *, builder):
+        for method, args, kwargs in self.calls:
+            getattr(builder, method)(*args, **kwargs)
+
+    def update(self):
+        return py_trees.common.Status.RUNNING
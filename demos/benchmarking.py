@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Headless execution of the performance benchmarks and
+machine-readable reporting of their results.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+from .instrumentation import TickLatencyHistogram
+from .mobil_perf import benchmark
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+# Order in which record fields are reported.
+RECORD_FIELDS = (
+    'benchmark',
+    'backend',
+    'layout',
+    'num_cars',
+    'traffic_density',
+    'num_agents',
+    'duration',
+    'ticks',
+    'setup_time',
+    'wall_time',
+    'realtime_rate',
+    'warmup',
+    'steady_state_realtime_rate',
+    'ticks_per_second',
+    'tick_latency_p50',
+    'tick_latency_p90',
+    'tick_latency_p99',
+    'tick_latency_max',
+)
+
+
+def run_benchmark(name, num_cars, traffic_density, duration,
+                  tree_time_step=0.02, realtime_rate=0., warmup=0.):
+    """
+    Run a registered benchmark headless, i.e. with no visualizer,
+    and measure its performance.
+    Args:
+        name: name of the benchmark in the `benchmark.register`
+        num_cars: number of MOBIL cars on scene
+        traffic_density: number of rail cars per MOBIL car on scene
+        duration: simulation length (s)
+        tree_time_step: behaviour tree tick period (s)
+        realtime_rate: ratio of sim vs real time, zero to run
+                       as fast as possible
+        warmup: length of the initial part of the simulation (s)
+                left out of the steady state realtime rate
+    Returns:
+        dict: the benchmark record, see RECORD_FIELDS
+    """
+    import delphyne.trees
+
+    args = argparse.Namespace(
+        num_cars=num_cars, traffic_density=traffic_density,
+        bare=True, batch=True, road_cache=False
+    )
+
+    setup_start = time.perf_counter()
+    scenario_subtree = benchmark.register[name](args)
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
+    simulation_tree.setup(
+        realtime_rate=realtime_rate,
+        start_paused=False,
+        log=False,
+        logfile_name=""
+    )
+    setup_time = time.perf_counter() - setup_start
+
+    number_of_ticks = int(duration / tree_time_step)
+    number_of_warmup_ticks = min(int(warmup / tree_time_step), number_of_ticks)
+    tick_latencies = TickLatencyHistogram()
+    simulation = simulation_tree.runner.get_simulation()
+    initial_sim_time = simulation.get_current_time()
+    run_start = time.perf_counter_ns()
+    steady_state_sim_time, steady_state_start = initial_sim_time, run_start
+    for tick in range(number_of_ticks):
+        if tick == number_of_warmup_ticks:
+            steady_state_sim_time = simulation.get_current_time()
+            steady_state_start = time.perf_counter_ns()
+        tick_start = time.perf_counter_ns()
+        simulation_tree.tick()
+        simulation_tree.runner.run_sync_for(tree_time_step)
+        tick_latencies.record(time.perf_counter_ns() - tick_start)
+    run_end = time.perf_counter_ns()
+    wall_time = (run_end - run_start) * 1e-9
+    sim_time = simulation.get_current_time() - initial_sim_time
+    steady_state_wall_time = (run_end - steady_state_start) * 1e-9
+    steady_state_sim_time = simulation.get_current_time() - steady_state_sim_time
+
+    return {
+        'benchmark': name,
+        # Named after the road behaviour, e.g. multilane or malidrive.
+        'backend': type(scenario_subtree).__name__.lower(),
+        'layout': getattr(benchmark.register[name], 'layout', 1),
+        'num_cars': num_cars,
+        'traffic_density': traffic_density,
+        'num_agents': num_cars + int(traffic_density * num_cars),
+        'duration': duration,
+        'ticks': number_of_ticks,
+        'setup_time': setup_time,
+        'wall_time': wall_time,
+        'realtime_rate': sim_time / wall_time if wall_time > 0. else 0.,
+        'warmup': warmup,
+        'steady_state_realtime_rate': (steady_state_sim_time / steady_state_wall_time
+                                       if steady_state_wall_time > 0. else 0.),
+        'ticks_per_second': number_of_ticks / wall_time if wall_time > 0. else 0.,
+        # Tick latencies are reported in milliseconds.
+        'tick_latency_p50': tick_latencies.percentile(50) * 1e-6,
+        'tick_latency_p90': tick_latencies.percentile(90) * 1e-6,
+        'tick_latency_p99': tick_latencies.percentile(99) * 1e-6,
+        'tick_latency_max': tick_latencies.max * 1e-6,
+    }
+
+
+def _pin_worker_to_core(cores):
+    """Pool initializer that pins each worker process to its own core."""
+    os.sched_setaffinity(0, {cores.get()})
+
+
+def _run_benchmark_config(config, **kwargs):
+    name, num_cars, traffic_density = config
+    return run_benchmark(name, num_cars, traffic_density, **kwargs)
+
+
+def parallel_map(function, iterable, jobs=1):
+    """
+    Map a function over an iterable, farming calls out to a pool of worker
+    processes when more than one job is requested. Each worker is pinned to
+    a core of its own if the platform allows it, so that concurrent calls do
+    not compete for the same core.
+    Args:
+        function: a picklable callable
+        iterable: arguments to call the function with
+        jobs: number of worker processes, zero to use one per available core
+    Returns:
+        iterator: function results, in completion order
+    """
+    available_cores = sorted(os.sched_getaffinity(0)) \
+        if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+    if jobs <= 0:
+        jobs = len(available_cores)
+    if jobs == 1:
+        yield from map(function, iterable)
+        return
+    initializer, initargs = None, ()
+    if hasattr(os, 'sched_setaffinity') and jobs <= len(available_cores):
+        cores = multiprocessing.Queue()
+        for core in available_cores[:jobs]:
+            cores.put(core)
+        initializer, initargs = _pin_worker_to_core, (cores,)
+    else:
+        print("Not enough cores to pin {} workers, running unpinned.".format(jobs))
+    with multiprocessing.Pool(jobs, initializer, initargs) as pool:
+        yield from pool.imap_unordered(function, iterable)
+
+
+def isolated_map(function, iterable, jobs=1):
+    """
+    Map a function over an iterable, calling it in a freshly spawned worker
+    process every time, so that calls share neither state nor memory
+    high-water marks with each other or with the calling process.
+    Args:
+        function: a picklable callable
+        iterable: arguments to call the function with
+        jobs: number of worker processes, zero to use one per available core
+    Returns:
+        iterator: function results, in completion order
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count()
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(jobs, maxtasksperchild=1) as pool:
+        yield from pool.imap_unordered(function, iterable)
+
+
+def peak_rss():
+    """Peak resident set size of the calling process (MiB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def proportional_set_size():
+    """
+    Proportional set size of the calling process (MiB), which charges
+    pages shared with other processes in equal parts to each of them.
+    None where the platform does not report it.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) / 1024.
+    except OSError:
+        pass
+    return None
+
+
+def run_benchmarks(configs, duration, jobs=1, realtime_rate=0.):
+    """
+    Run benchmarks for a sequence of configurations, in parallel
+    if more than one job is requested (see parallel_map()).
+    Args:
+        configs: (benchmark name, num_cars, traffic_density) tuples
+        duration: simulation length of each run (s)
+        jobs: number of worker processes, zero to use one per available core
+        realtime_rate: ratio of sim vs real time, zero to run as fast as possible
+    Returns:
+        iterator: benchmark records, in completion order
+    """
+    run = functools.partial(
+        _run_benchmark_config, duration=duration, realtime_rate=realtime_rate
+    )
+    return parallel_map(run, configs, jobs)
+
+
+def print_report(records):
+    """
+    Print a table summarizing benchmark records, sorted by configuration.
+    Args:
+        records: benchmark records, as returned by run_benchmark()
+    """
+    print("{:<20} {:>8} {:>8} {:>10} {:>10} {:>10} {:>10}".format(
+        'benchmark', 'cars', 'traffic', 'ticks/s', 'rt rate', 'p50 (ms)', 'p99 (ms)'))
+    for record in sorted(records, key=lambda record: (
+            record['benchmark'], record['num_cars'], record['traffic_density'])):
+        print("{benchmark:<20} {num_cars:>8} {traffic_density:>8.2f} "
+              "{ticks_per_second:>10.1f} {realtime_rate:>10.2f} "
+              "{tick_latency_p50:>10.2f} {tick_latency_p99:>10.2f}".format(**record))
+
+
+def record_key(record):
+    """
+    Key that identifies the configuration a benchmark record was run with.
+    Benchmarks past their first agent layout carry its version, so that
+    baselines of another layout never match.
+    """
+    key = "{benchmark}/{num_cars}/{traffic_density}".format(**record)
+    if record.get('layout', 1) > 1:
+        key += "/layout{}".format(record['layout'])
+    return key
+
+
+def save_baseline(records, path):
+    """
+    Save benchmark records as a baseline to later compare against.
+    Args:
+        records: benchmark records, as returned by run_benchmark()
+        path: baseline file path
+    """
+    with open(path, 'w') as baseline_file:
+        json.dump({record_key(record): record for record in records},
+                  baseline_file, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """
+    Load a baseline saved by save_baseline().
+    Args:
+        path: baseline file path
+    Returns:
+        dict: baseline records, keyed by record_key()
+    """
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_to_baseline(records, baseline, tolerance):
+    """
+    Compare benchmark records against a baseline. A record regresses
+    when its ticks per second drop, or its p99 tick latency grows,
+    by more than the given tolerance relative to the baseline.
+    Args:
+        records: benchmark records, as returned by run_benchmark()
+        baseline: baseline records, as returned by load_baseline()
+        tolerance: allowed relative change, e.g. 0.1 for 10%
+    Returns:
+        list: a human-readable description for each regression found,
+              including comparing nothing at all as one
+    """
+    regressions = []
+    compared = 0
+    for record in records:
+        key = record_key(record)
+        if key not in baseline:
+            print("No baseline for {}, skipping.".format(key))
+            continue
+        compared += 1
+        reference = baseline[key]
+        min_ticks_per_second = reference['ticks_per_second'] * (1. - tolerance)
+        if record['ticks_per_second'] < min_ticks_per_second:
+            regressions.append(
+                "{}: {:.1f} ticks/s is below the {:.1f} ticks/s baseline".format(
+                    key, record['ticks_per_second'], reference['ticks_per_second']))
+        max_tick_latency_p99 = reference['tick_latency_p99'] * (1. + tolerance)
+        if record['tick_latency_p99'] > max_tick_latency_p99:
+            regressions.append(
+                "{}: {:.2f}ms p99 tick latency is above the {:.2f}ms baseline".format(
+                    key, record['tick_latency_p99'], reference['tick_latency_p99']))
+    if not compared:
+        regressions.append(
+            "none of the {} benchmark records has a baseline to compare against".format(
+                len(records)))
+    return regressions
+
+
+class RecordWriter(object):
+    """
+    Appends benchmark records to a file as soon as they are available,
+    so that partial results survive an interrupted sweep. Files with a
+    `.csv` extension get one CSV row per record, with the given fields,
+    anything else gets a JSON object per line.
+    """
+
+    def __init__(self, path, fieldnames=RECORD_FIELDS):
+        self._csv = os.path.splitext(path)[1].lower() == '.csv'
+        self._file = open(path, 'w', newline='')
+        if self._csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=fieldnames)
+            self._writer.writeheader()
+
+    def write(self, record):
+        """Write a single record and flush it to disk."""
+        if self._csv:
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        """Close the underlying file."""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
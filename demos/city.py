@@ -42,16 +42,8 @@ import functools
 import os.path
 import sys
 
-import delphyne.trees
-import delphyne.behaviours
-import delphyne.blackboard
-import delphyne.maliput as maliput
-
-import delphyne_gui.utilities
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
+from . import resources
 
 ##############################################################################
 # Supporting Classes & Methods
@@ -85,6 +77,7 @@ MOBIL controlled cars running in a closed-loop maliput road.
 
 def lane_position_to_inertial_pose2d(road_geometry, lane_id, lane_position):
 
+    import delphyne.maliput as maliput
     from delphyne.blackboard.providers import resolve
     lane_id = resolve(lane_id, road_geometry)
     lane_position = resolve(lane_position, road_geometry, lane_id)
@@ -98,23 +91,133 @@ def lane_position_to_inertial_pose2d(road_geometry, lane_id, lane_position):
     return xyz.x(), xyz.y(), initial_heading
 
 
-def create_city_scenario_subtree(num_rail_cars, num_mobil_cars):
-    file_path = delphyne_gui.utilities.get_delphyne_gui_resource(
+class LaneLookup(object):
+    """Looks lanes of a road geometry up by id, once per lane."""
+
+    def __init__(self, road_geometry):
+        self._road_index = road_geometry.ById()
+        self._lanes = {}
+
+    def get(self, lane_id):
+        """Get the lane with the given id."""
+        import delphyne.maliput as maliput
+
+        lane = self._lanes.get(lane_id)
+        if lane is None:
+            lane = self._road_index.GetLane(maliput.LaneId(lane_id))
+            self._lanes[lane_id] = lane
+        return lane
+
+
+def lane_positions_to_inertial_poses2d(road_geometry, lane_ids, s, r=None, lanes=None):
+    """
+    Convert a batch of lane positions to inertial 2D poses.
+    Args:
+        road_geometry: the road geometry the lanes belong to
+        lane_ids: lane ids, one per position
+        s: longitudinal positions (m)
+        r: lateral positions (m), zero if not given
+        lanes: a LaneLookup of the road geometry, to share it across batches
+    Returns:
+        tuple: x (m), y (m) and heading (rad) arrays
+    """
+    import numpy as np
+
+    import delphyne.maliput as maliput
+
+    if lanes is None:
+        lanes = LaneLookup(road_geometry)
+    s = np.asarray(s, dtype=float)
+    r = np.zeros_like(s) if r is None else np.asarray(r, dtype=float)
+    x = np.empty_like(s)
+    y = np.empty_like(s)
+    heading = np.empty_like(s)
+    for i, lane_id in enumerate(lane_ids):
+        lane = lanes.get(lane_id)
+        lane_position = maliput.LanePosition(s[i], r[i], 0.)
+        xyz = lane.ToInertialPosition(lane_position).xyz()
+        x[i], y[i] = xyz.x(), xyz.y()
+        heading[i] = lane.GetOrientation(lane_position).rpy().yaw_angle()
+    return x, y, heading
+
+
+class InertialPoseBatch(object):
+    """
+    The initial poses of a batch of agents, given as lane positions and
+    converted to inertial poses all at once, when the first agent of the
+    batch is set up.
+    Args:
+        lane_ids: lane ids, or resolvables thereof
+        lane_positions: lane positions, or resolvables thereof
+    """
+
+    def __init__(self, lane_ids, lane_positions):
+        self.lane_ids = lane_ids
+        self.lane_positions = lane_positions
+        self.poses = None
+
+    def __len__(self):
+        return len(self.lane_ids)
+
+    def initial_pose(self, index):
+        """Initial pose resolvable of the index-th agent of the batch."""
+        return functools.partial(self._initial_pose, index=index)
+
+    def _initial_pose(self, road_geometry, index):
+        if self.poses is None:
+            self.poses = self.resolve(road_geometry)
+        x, y, heading = self.poses
+        return float(x[index]), float(y[index]), float(heading[index])
+
+    def resolve(self, road_geometry):
+        """Resolve the inertial poses of the whole batch."""
+        from delphyne.blackboard.providers import resolve
+
+        lane_ids, s, r = [], [], []
+        for lane_id, lane_position in zip(self.lane_ids, self.lane_positions):
+            lane_id = resolve(lane_id, road_geometry)
+            lane_position = resolve(lane_position, road_geometry, lane_id)
+            lane_ids.append(lane_id)
+            s.append(lane_position.s())
+            r.append(lane_position.r())
+        return lane_positions_to_inertial_poses2d(road_geometry, lane_ids, s, r)
+
+
+def create_city_road():
+    """Create the little city road, with no agents on it."""
+    import delphyne.behaviours
+
+    file_path = resources.get_delphyne_gui_resource(
         "roads/little_city.yaml"
     )
 
     if not os.path.isfile(file_path):
         print("Required file {} not found."
               " Please, make sure to install the latest delphyne_gui."
-              .format(os.path.abspath(file_path)))
+              .format(file_path or "roads/little_city.yaml"))
         sys.exit()
 
-    scenario_subtree = delphyne.behaviours.roads.Multilane(
+    return delphyne.behaviours.roads.Multilane(
         file_path=file_path, name="little_city"
     )
 
+
+def add_city_agents(scenario_subtree, num_rail_cars, num_mobil_cars, seed=1):
+    """
+    Add rail cars and MOBIL cars to a road, spread across its lanes.
+    Args:
+        scenario_subtree: the road behaviour to add the agents to
+        num_rail_cars: number of rail cars
+        num_mobil_cars: number of MOBIL cars
+        seed: seed of the random placement of the agents
+    Returns:
+        the road behaviour
+    """
+    import delphyne.behaviours
+    import delphyne.blackboard
+
     provider = delphyne.blackboard.providers.LaneLocationProvider(
-        distance_between_agents=6.0, seed=1
+        distance_between_agents=6.0, seed=seed
     )
 
     # Sets up all railcars.
@@ -131,24 +234,30 @@ def create_city_scenario_subtree(num_rail_cars, num_mobil_cars):
 
     # Sets up all MOBIL cars.
     mobilcar_speed = 4.0  # (m/s)
+    poses = InertialPoseBatch(
+        [provider.random_lane] * num_mobil_cars,
+        [provider.random_lane_position] * num_mobil_cars
+    )
     for m in range(num_mobil_cars):
         scenario_subtree.add_child(
             delphyne.behaviours.agents.MobilCar(
                 name='mobil{}'.format(m),
                 speed=mobilcar_speed,
-                initial_pose=functools.partial(
-                    lane_position_to_inertial_pose2d,
-                    lane_id=provider.random_lane,
-                    lane_position=provider.random_lane_position
-                )
+                initial_pose=poses.initial_pose(m)
             )
         )
 
     return scenario_subtree
 
 
+def create_city_scenario_subtree(num_rail_cars, num_mobil_cars):
+    return add_city_agents(create_city_road(), num_rail_cars, num_mobil_cars)
+
+
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     args = parse_arguments()
 
     simulation_tree = delphyne.trees.BehaviourTree(
@@ -165,17 +274,6 @@ def main():
     )
 
     tree_time_step = 0.02
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+A non-blocking log of collisions between agents.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import json
+import queue
+import threading
+import time
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+# Queued in place of a record when the simulation gets paused.
+PAUSED = object()
+
+
+class CollisionEventLog(object):
+    """
+    Logs collisions between agents without blocking the simulation.
+    Collisions are turned into compact records on the calling thread:
+    simulation time, agent names, location and relative speed. A
+    background thread then appends them to a file as JSON lines and
+    prints, at most once every `console_period`, how many collisions
+    there were since the last time it did, as well as whether that
+    paused the simulation. While the simulation stays paused, time
+    stands still and the same collisions keep being found, so they are
+    neither logged again nor reported as another pause.
+
+    Pass it as the `on_collisions` callable of a collision check, see
+    crash.CollisionMonitor, and close it once the simulation is over.
+
+    Args:
+        path: file to append records to, None to only print to console
+        pause: whether to pause the simulation on collision, or go on
+        console_period: minimum time in between console reports (s)
+    """
+
+    def __init__(self, path=None, pause=False, console_period=1.):
+        self.pause = pause
+        self.console_period = console_period
+        self.events = 0
+        self._file = open(path, 'a') if path else None
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def __call__(self, behaviour_tree, agent_collisions):
+        import numpy as np
+
+        if self.pause and behaviour_tree.runner.is_simulation_paused():
+            return
+        simulation_time = behaviour_tree.runner.get_simulation().get_current_time()
+        for collision in agent_collisions:
+            agent1, agent2 = collision.agents
+            relative_velocity = (np.asarray(agent1.get_velocity()[3:]) -
+                                 np.asarray(agent2.get_velocity()[3:]))
+            self._queue.put({
+                'time': simulation_time,
+                'agents': [agent1.name(), agent2.name()],
+                'location': [float(value) for value in collision.location],
+                'relative_speed': float(np.linalg.norm(relative_velocity)),
+            })
+        self.events += len(agent_collisions)
+        if self.pause:
+            behaviour_tree.runner.pause_simulation()
+            self._queue.put(PAUSED)
+
+    def pending(self):
+        """Number of records yet to be written."""
+        return self._queue.qsize()
+
+    @staticmethod
+    def _report(count, latest):
+        print("{} collisions, the latest between {} and {} at {:.2f}s".format(
+            count, *latest['agents'], latest['time']))
+
+    def _write(self):
+        last_report_time = time.monotonic()
+        unreported, latest = 0, None
+        while True:
+            try:
+                record = self._queue.get(timeout=self.console_period)
+                if record is None:
+                    break
+                if record is PAUSED:
+                    if unreported:
+                        self._report(unreported, latest)
+                        unreported = 0
+                    print("Collisions have been detected, simulation paused.")
+                    last_report_time = time.monotonic()
+                    continue
+                if self._file is not None:
+                    self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+                unreported, latest = unreported + 1, record
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            if unreported and now - last_report_time >= self.console_period:
+                self._report(unreported, latest)
+                last_report_time, unreported = now, 0
+        if unreported:
+            self._report(unreported, latest)
+
+    def close(self):
+        """Write all pending records and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
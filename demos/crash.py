@@ -37,21 +37,106 @@ The crash demo.
 # Imports
 ##############################################################################
 
+import functools
 import math
-import numpy as np
-
-import delphyne.trees
-import delphyne.behaviours
-
-from delphyne_gui.utilities import launch_interactive_simulation
+import random
+import time
 
+from . import collision_log
 from . import helpers
+from . import instrumentation
+from . import recording
 
 ##############################################################################
 # Supporting Classes & Methods
 ##############################################################################
 
 
+def crash_pattern(poses_fn):
+    """
+    Helper decorator to register functions that lay cars out
+    in collision course.
+    """
+    if not hasattr(crash_pattern, 'register'):
+        crash_pattern.register = {}
+    crash_pattern.register[poses_fn.__name__] = poses_fn
+    return poses_fn
+
+
+@crash_pattern
+def ring(num_cars, seed, time_to_collision, spacing=6.):
+    """
+    Cars evenly spread over a circle, all heading to its center.
+    Args:
+        num_cars: number of cars
+        seed: unused, all ring layouts are alike
+        time_to_collision: time for cars to reach the center (s)
+        spacing: distance between neighbouring cars (m)
+    Returns:
+        list: (x (m), y (m), heading (rad), speed (m/s)) tuples
+    """
+    radius = max(50., num_cars * spacing / (2. * math.pi))
+    speed = radius / time_to_collision
+    poses = []
+    for i in range(num_cars):
+        angle = 2. * math.pi * i / num_cars
+        poses.append((radius * math.cos(angle), radius * math.sin(angle),
+                      angle + math.pi, speed))
+    return poses
+
+
+@crash_pattern
+def opposing(num_cars, seed, time_to_collision, lane_width=4., distance=50.):
+    """
+    Pairs of cars on parallel lanes, driving head on into each other.
+    An odd car out drives alone on a lane of its own.
+    Args:
+        num_cars: number of cars
+        seed: unused, all opposing layouts are alike
+        time_to_collision: time for each pair of cars to meet (s)
+        lane_width: distance between lanes (m)
+        distance: distance between the cars of a pair (m)
+    Returns:
+        list: (x (m), y (m), heading (rad), speed (m/s)) tuples
+    """
+    speed = 0.5 * distance / time_to_collision
+    poses = []
+    for i in range(num_cars):
+        lane, side = divmod(i, 2)
+        x = 0.5 * distance * (1. if side else -1.)
+        poses.append((x, lane * lane_width, math.pi if side else 0., speed))
+    return poses
+
+
+@crash_pattern
+def scattered(num_cars, seed, time_to_collision, spacing=6.):
+    """
+    Cars scattered at random around a central area, each heading to a
+    random point within it with a speed to get there in time.
+    Args:
+        num_cars: number of cars
+        seed: seed of the random layout
+        time_to_collision: time for cars to reach their target point (s)
+        spacing: mean distance between cars in the central area (m)
+    Returns:
+        list: (x (m), y (m), heading (rad), speed (m/s)) tuples
+    """
+    rng = random.Random(seed)
+    target_radius = spacing * math.sqrt(num_cars) / 2.
+    poses = []
+    for _ in range(num_cars):
+        target_angle = rng.uniform(0., 2. * math.pi)
+        target_distance = target_radius * math.sqrt(rng.random())
+        target_x = target_distance * math.cos(target_angle)
+        target_y = target_distance * math.sin(target_angle)
+        heading = rng.uniform(-math.pi, math.pi)
+        distance = rng.uniform(2., 4.) * target_radius + 50.
+        poses.append((target_x - distance * math.cos(heading),
+                      target_y - distance * math.sin(heading),
+                      heading, distance / time_to_collision))
+    return poses
+
+
 def parse_arguments():
     """Argument passing and demo documentation."""
     parser = helpers.create_argument_parser(
@@ -61,19 +146,62 @@ An example that exercises collision detection by setting up multiple cars
 in collision course.
         """
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--broad-phase", action="store_true", default=False,
+        help=("Only check for collisions when agents come close to each "
+              "other, and report the per tick cost of collision checking.")
+    )
+    parser.add_argument(
+        "--collision-log", default=None,
+        help=("File to log collisions to, as JSON lines, instead of printing "
+              "them out in full (default: none).")
+    )
+    parser.add_argument(
+        "--on-collision", default="pause", choices=("pause", "continue"),
+        help="Whether to pause the simulation on collision (default: pause)."
+    )
+    parser.add_argument(
+        "--record", default=None, metavar="DIRECTORY",
+        help="Directory to record agent states to (default: none)."
+    )
+    parser.add_argument(
+        "--record-rate", default=10., type=float,
+        help="Agent state samples per second of simulation time (default: 10)."
+    )
+    parser.add_argument(
+        "--record-compression", default=None,
+        choices=("auto",) + tuple(recording.CODECS.keys()),
+        help=("Compress agent state recordings with the given codec, auto picks "
+              "the best available one (default: no compression).")
+    )
+    parser.add_argument(
+        "--pattern", default=None, choices=crash_pattern.register.keys(),
+        help=("Lay `--num-cars` cars out in collision course as a ring, in "
+              "opposing pairs or scattered at random (default: four cars "
+              "crossing paths).")
+    )
+    parser.add_argument(
+        "-n", "--num-cars", default=100, type=int,
+        help="The number of cars of a `--pattern` (default: 100)."
+    )
+    parser.add_argument(
+        "--seed", default=1, type=int,
+        help="Seed of `--pattern` layouts that are random (default: 1)."
+    )
+    helpers.add_handler_budget_arguments(parser)
+    args = parser.parse_args()
+    helpers.check_handler_budget_arguments(parser, args)
+    return args
 
 
-def check_for_agent_collisions(simulation_subtree):
+def print_agent_collisions(agent_collisions):
     """
-    Pre tick handler that checks for collisions between agents in simulation.
-
-    TODO(hidmic): make it a behaviour?
+    Print the details of collisions between agents.
+    Args:
+        agent_collisions: collisions, as returned by the simulation
     """
-    simulation = simulation_subtree.runner.get_simulation()
-    agent_collisions = simulation.get_collisions()
-    if not agent_collisions:
-        return
+    import numpy as np
+
     print("Collisions have been detected!")
     for collision in agent_collisions:
         agent1, agent2 = collision.agents
@@ -90,11 +218,160 @@ def check_for_agent_collisions(simulation_subtree):
             agent2.name(), np.linalg.norm(agent2_velocity[3:]), agent1.name()
         ))
         print("    It now rests at {}.".format(agent2.get_pose_translation()))
+
+
+def check_for_agent_collisions(simulation_subtree, on_collisions=None):
+    """
+    Pre tick handler that checks for collisions between agents in simulation.
+    Unless an `on_collisions` callable taking the behaviour tree and the list
+    of collisions is given, collisions are printed and the simulation paused.
+
+    TODO(hidmic): make it a behaviour?
+    """
+    simulation = simulation_subtree.runner.get_simulation()
+    agent_collisions = simulation.get_collisions()
+    if not agent_collisions:
+        return
+    if on_collisions is not None:
+        on_collisions(simulation_subtree, agent_collisions)
+        return
+    print_agent_collisions(agent_collisions)
     simulation_subtree.runner.pause_simulation()
     print("\nSimulation paused.")
 
 
+def find_close_pairs(positions, distance):
+    """
+    Find all pairs of points closer than a given distance, sweeping
+    over them sorted along the x axis.
+    Args:
+        positions: an N x 2 array of points
+        distance: distance below which points are paired
+    Returns:
+        tuple: arrays of first and second indices of the pairs found
+    """
+    import numpy as np
+
+    order = np.argsort(positions[:, 0], kind='stable')
+    sorted_x = positions[order, 0]
+    ends = np.searchsorted(sorted_x, sorted_x + distance, side='right')
+    counts = ends - np.arange(len(order)) - 1
+    first = np.repeat(np.arange(len(order)), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first, second = order[first], order[second]
+    squared_distances = np.sum((positions[first] - positions[second])**2, axis=1)
+    close = squared_distances < distance * distance
+    return first[close], second[close]
+
+
+class CollisionMonitor(object):
+    """
+    Checks for collisions between agents in two phases. A broad phase
+    gathers all agent positions into a single array, reading them off
+    the bundle of poses the simulation publishes every step one agent at
+    a time, as the bundle has no bulk accessor. It then sweeps the array
+    for pairs of agents closer than `distance`, which must be larger
+    than twice the radius of the largest agent. Only when there are any,
+    the simulation is asked for collisions, which are reported as they
+    are.
+
+    The cost of every check is kept in a latency histogram, and so are
+    the costs of gathering positions and of sweeping them, which make
+    it up along with any escalation. Attach it to a behaviour tree with:
+
+        simulation_tree.add_pre_tick_handler(monitor.pre_tick_handler)
+
+    Args:
+        agent_names: names of the agents to monitor
+        distance: distance below which pairs of agents may collide (m)
+        on_collisions: callable taking the behaviour tree and the list of
+                       collisions found, pauses the simulation by default
+    """
+
+    def __init__(self, agent_names, distance=6., on_collisions=None):
+        self.agent_names = list(agent_names)
+        self.distance = distance
+        self.on_collisions = on_collisions or self.pause_on_collisions
+        self.cost = instrumentation.TickLatencyHistogram()
+        self.gather_cost = instrumentation.TickLatencyHistogram()
+        self.sweep_cost = instrumentation.TickLatencyHistogram()
+        self.escalations = 0
+        self.collisions = 0
+        self._indices = None
+        self._positions = None
+
+    def setup(self, simulation):
+        """
+        Look the monitored agents up in the pose bundle of the simulation,
+        to keep it out of the first check.
+        Args:
+            simulation: the simulation the agents live in
+        """
+        import numpy as np
+
+        poses = simulation.get_current_poses()
+        indices = {poses.get_name(index): index for index in range(poses.get_num_poses())}
+        self._indices = [indices[name] for name in self.agent_names]
+        self._positions = np.empty((len(self._indices), 2))
+
+    def _gather_positions(self, simulation):
+        if self._indices is None:
+            self.setup(simulation)
+        poses = simulation.get_current_poses()
+        for k, index in enumerate(self._indices):
+            self._positions[k] = poses.get_transform(index).translation()[:2]
+        return self._positions
+
+    def check(self, simulation):
+        """
+        Check for collisions between the monitored agents.
+        Args:
+            simulation: the simulation the agents live in
+        Returns:
+            list: collisions found, empty if none
+        """
+        start = time.perf_counter_ns()
+        positions = self._gather_positions(simulation)
+        gathered = time.perf_counter_ns()
+        first, _ = find_close_pairs(positions, self.distance)
+        self.sweep_cost.record(time.perf_counter_ns() - gathered)
+        self.gather_cost.record(gathered - start)
+        if not len(first):
+            return []
+        self.escalations += 1
+        return simulation.get_collisions()
+
+    def pre_tick_handler(self, behaviour_tree):
+        """Pre tick handler to attach to a behaviour tree."""
+        start = time.perf_counter_ns()
+        agent_collisions = self.check(behaviour_tree.runner.get_simulation())
+        self.cost.record(time.perf_counter_ns() - start)
+        if agent_collisions:
+            self.collisions += len(agent_collisions)
+            self.on_collisions(behaviour_tree, agent_collisions)
+
+    @staticmethod
+    def pause_on_collisions(behaviour_tree, agent_collisions):
+        """Print collisions and pause the simulation."""
+        print_agent_collisions(agent_collisions)
+        behaviour_tree.runner.pause_simulation()
+        print("\nSimulation paused.")
+
+    def print_stats(self):
+        """Print the per tick cost of collision checking, and of its phases."""
+        summary = self.cost.summary()
+        print("Collision checks: {} ticks, {} escalated, {} collisions".format(
+            summary['count'], self.escalations, self.collisions))
+        for label, histogram in (('cost per tick', self.cost),
+                                 ('  gathering positions', self.gather_cost),
+                                 ('  sweeping', self.sweep_cost)):
+            print("  {}: p50 {p50:.3f} ms, p90 {p90:.3f} ms, "
+                  "p99 {p99:.3f} ms, max {max:.3f} ms".format(label, **histogram.summary()))
+
+
 def create_crash_scenario_subtree():
+    import delphyne.behaviours
+
     scenario_subtree = delphyne.behaviours.roads.Road()
 
     scenario_subtree.add_children([
@@ -131,6 +408,36 @@ def create_crash_scenario_subtree():
     return scenario_subtree
 
 
+def create_crash_stress_scenario_subtree(pattern, num_cars, seed=1, time_to_collision=5.):
+    """
+    Set up a scenario with many cars in collision course.
+    Args:
+        pattern: name of the layout in the `crash_pattern.register`
+        num_cars: number of cars
+        seed: seed of random layouts
+        time_to_collision: time until the first collisions (s)
+    Returns:
+        the scenario subtree
+    """
+    import delphyne.behaviours
+
+    scenario_subtree = delphyne.behaviours.roads.Road()
+
+    poses = crash_pattern.register[pattern](num_cars, seed, time_to_collision)
+    for i, (x, y, heading, speed) in enumerate(poses):
+        scenario_subtree.add_child(
+            delphyne.behaviours.agents.SimpleCar(
+                name="racer" + str(i),
+                # scene coordinates (m, m, radians)
+                initial_pose=(x, y, heading),
+                # speed in the direction of travel (m/s)
+                speed=speed
+            )
+        )
+
+    return scenario_subtree
+
+
 ##############################################################################
 # Main
 ##############################################################################
@@ -138,11 +445,24 @@ def create_crash_scenario_subtree():
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     args = parse_arguments()
 
-    simulation_tree = delphyne.trees.BehaviourTree(
-        root=create_crash_scenario_subtree()
-    )
+    if args.pattern is None:
+        scenario_subtree = create_crash_scenario_subtree()
+    else:
+        scenario_subtree = create_crash_stress_scenario_subtree(
+            args.pattern, args.num_cars, args.seed
+        )
+    agent_names = [agent.name for agent in scenario_subtree.children]
+    recorder = None
+    if args.record:
+        recorder = recording.record_agents(
+            scenario_subtree, args.record, args.record_rate,
+            compression=args.record_compression
+        )
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
 
     simulation_tree.setup(
         realtime_rate=args.realtime_rate,
@@ -151,21 +471,39 @@ def main():
         logfile_name=args.logfile_name
     )
 
-    # Adds a callback to check for agent collisions.
-    simulation_tree.add_pre_tick_handler(check_for_agent_collisions)
+    # Logs collisions in the background, unless they are to pause the
+    # simulation with nothing but the console to report them to.
+    event_log = None
+    if args.collision_log or args.on_collision == 'continue':
+        event_log = collision_log.CollisionEventLog(
+            args.collision_log, pause=args.on_collision == 'pause'
+        )
+
+    # Adds a callback to check for agent collisions, timed and held to a
+    # budget if requested. Missing collisions is not an option, so it is
+    # never demoted.
+    handlers = helpers.create_tick_handler_dispatcher(args)
+    monitor = None
+    if args.broad_phase:
+        monitor = CollisionMonitor(agent_names, on_collisions=event_log)
+        monitor.setup(simulation_tree.runner.get_simulation())
+        handlers.add(monitor.pre_tick_handler, demotable=False)
+    else:
+        handlers.add(functools.partial(
+            check_for_agent_collisions, on_collisions=event_log
+        ), demotable=False)
+    simulation_tree.add_pre_tick_handler(handlers)
 
     tree_time_step = 0.02
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
+
+    if recorder is not None:
+        recorder.close()
+        recorder.print_stats()
+    if event_log is not None:
+        event_log.close()
+    if monitor is not None:
+        monitor.print_stats()
+    handlers.print_stats()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Measures the cost of collision checking, and the rate at which collisions
+are reported, as the number of cars in collision course grows.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import functools
+import time
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import crash
+from .instrumentation import TickLatencyHistogram
+from .mobil_perf_sweep import sweep_values
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+# Order in which record fields are reported.
+RECORD_FIELDS = (
+    'pattern',
+    'num_cars',
+    'seed',
+    'duration',
+    'ticks',
+    'setup_time',
+    'wall_time',
+    'realtime_rate',
+    'escalations',
+    'collisions',
+    'collisions_per_second',
+    'collision_check_p50',
+    'collision_check_p99',
+    'collision_check_max',
+    'tick_latency_p50',
+    'tick_latency_p99',
+)
+
+
+def run_crash_stress(config, duration, tree_time_step=0.02, time_to_collision=None):
+    """
+    Run a crash stress scenario headless and as fast as possible,
+    checking for collisions every tick without ever pausing.
+    Args:
+        config: a (pattern name, num_cars, seed) tuple
+        duration: simulation length (s)
+        tree_time_step: behaviour tree tick period (s)
+        time_to_collision: time until the first collisions (s),
+                           half the duration by default
+    Returns:
+        dict: the stress record, see RECORD_FIELDS
+    """
+    import delphyne.trees
+
+    pattern, num_cars, seed = config
+    if time_to_collision is None:
+        time_to_collision = 0.5 * duration
+
+    setup_start = time.perf_counter()
+    scenario_subtree = crash.create_crash_stress_scenario_subtree(
+        pattern, num_cars, seed, time_to_collision
+    )
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
+    simulation_tree.setup(
+        realtime_rate=0.,
+        start_paused=False,
+        log=False,
+        logfile_name=""
+    )
+    monitor = crash.CollisionMonitor(
+        [agent.name for agent in scenario_subtree.children],
+        on_collisions=lambda behaviour_tree, agent_collisions: None
+    )
+    monitor.setup(simulation_tree.runner.get_simulation())
+    simulation_tree.add_pre_tick_handler(monitor.pre_tick_handler)
+    setup_time = time.perf_counter() - setup_start
+
+    number_of_ticks = int(duration / tree_time_step)
+    tick_latencies = TickLatencyHistogram()
+    simulation = simulation_tree.runner.get_simulation()
+    initial_sim_time = simulation.get_current_time()
+    run_start = time.perf_counter_ns()
+    for _ in range(number_of_ticks):
+        tick_start = time.perf_counter_ns()
+        simulation_tree.tick()
+        simulation_tree.runner.run_sync_for(tree_time_step)
+        tick_latencies.record(time.perf_counter_ns() - tick_start)
+    wall_time = (time.perf_counter_ns() - run_start) * 1e-9
+    sim_time = simulation.get_current_time() - initial_sim_time
+
+    return {
+        'pattern': pattern,
+        'num_cars': num_cars,
+        'seed': seed,
+        'duration': duration,
+        'ticks': number_of_ticks,
+        'setup_time': setup_time,
+        'wall_time': wall_time,
+        'realtime_rate': sim_time / wall_time if wall_time > 0. else 0.,
+        'escalations': monitor.escalations,
+        'collisions': monitor.collisions,
+        'collisions_per_second': monitor.collisions / wall_time if wall_time > 0. else 0.,
+        # Latencies are reported in milliseconds.
+        'collision_check_p50': monitor.cost.percentile(50) * 1e-6,
+        'collision_check_p99': monitor.cost.percentile(99) * 1e-6,
+        'collision_check_max': monitor.cost.max * 1e-6,
+        'tick_latency_p50': tick_latencies.percentile(50) * 1e-6,
+        'tick_latency_p99': tick_latencies.percentile(99) * 1e-6,
+    }
+
+
+def print_report(records):
+    """
+    Print a table summarizing crash stress records, sorted by configuration.
+    Args:
+        records: crash stress records, as returned by run_crash_stress()
+    """
+    print("{:<12} {:>8} {:>10} {:>12} {:>12} {:>12} {:>12}".format(
+        'pattern', 'cars', 'rt rate', 'collisions', 'coll/s', 'check p50', 'check p99'))
+    for record in sorted(records, key=lambda record: (record['pattern'], record['num_cars'])):
+        print("{pattern:<12} {num_cars:>8} {realtime_rate:>10.2f} {collisions:>12} "
+              "{collisions_per_second:>12.1f} {collision_check_p50:>10.3f}ms "
+              "{collision_check_p99:>10.3f}ms".format(**record))
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Crash Stress",
+            """
+Runs crash scenarios with growing numbers of cars in collision course,
+each run in a worker process of its own, headless and as fast as possible.
+Collisions are checked every tick, in two phases, and never pause the
+simulation. Reports the per tick cost of collision checking and the rate
+at which collisions are reported.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "patterns", nargs="*", metavar="pattern",
+        help="Layouts to run, out of: {} (default: all).".format(
+            ", ".join(crash.crash_pattern.register.keys()))
+    )
+    parser.add_argument(
+        "-n", "--num-cars", default=[10, 100, 1000], type=sweep_values(int),
+        help=("Numbers of cars to sweep, as a list or as a start:stop:step "
+              "range (default: 10,100,1000).")
+    )
+    parser.add_argument(
+        "-s", "--seed", default=1, type=int,
+        help="Seed of random layouts (default: 1)."
+    )
+    parser.add_argument(
+        "-d", "--duration", default=10., type=float,
+        help=("Simulation length of each run (sec), cars start colliding "
+              "halfway through (default: 10s).")
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help=("Number of runs to run in parallel. Zero uses all available "
+              "cores. Parallel runs skew timings (default: 1)")
+    )
+    parser.add_argument(
+        "-o", "--output", default="crash_stress.jsonl",
+        help=("File to write records to, as CSV if it has a .csv extension "
+              "and as JSON lines otherwise (default: crash_stress.jsonl)")
+    )
+    args = parser.parse_args()
+    for pattern in args.patterns:
+        if pattern not in crash.crash_pattern.register:
+            parser.error("unknown pattern {}".format(pattern))
+    return args
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    patterns = args.patterns or list(crash.crash_pattern.register.keys())
+    configs = [
+        (pattern, num_cars, args.seed)
+        for pattern in patterns
+        for num_cars in args.num_cars
+    ]
+    run = functools.partial(run_crash_stress, duration=args.duration)
+    records = []
+    with benchmarking.RecordWriter(args.output, RECORD_FIELDS) as writer:
+        for record in benchmarking.isolated_map(run, configs, args.jobs):
+            print("{pattern} with {num_cars} cars: {collisions} collisions, "
+                  "{collision_check_p99:.3f}ms p99 check".format(**record))
+            writer.write(record)
+            records.append(record)
+    print_report(records)
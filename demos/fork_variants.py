@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Runs many variants of a scenario on the same road, loading the road once
+in a parent process and forking workers that inherit it copy-on-write.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import time
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import city
+from . import gazoo
+from . import mali
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+SCENARIOS = ('mali', 'gazoo', 'city')
+
+# The road loaded by the parent process, inherited by forked workers.
+_preloaded_road = None
+
+
+class RecordingBuilder(object):
+    """
+    Stands in for a simulation builder, recording the calls made to it
+    instead of building anything.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, method):
+        def record(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+        return record
+
+
+def preload_road(road):
+    """
+    Load the road network of a road behaviour with no simulation to
+    hand it over to.
+    Args:
+        road: a road behaviour, with no agents on it
+    Returns:
+        list: the builder calls the road behaviour set up with, see
+              behaviours.roads.PreloadedRoad
+    """
+    builder = RecordingBuilder()
+    road.setup(builder=builder)
+    return builder.calls
+
+
+def create_road(options):
+    """Create the road behaviour of a scenario, with no agents on it."""
+    if options.scenario == 'mali':
+        road = mali.get_known_road(options.road_name)
+        return mali.create_malidrive_road(
+            road['file_path'], road['yaml_file_path'],
+            mali.create_road_features(headless=True),
+            road['linear_tolerance'], road['angular_tolerance']
+        )
+    if options.scenario == 'gazoo':
+        return gazoo.create_gazoo_road(options.maliput_backend, headless=True)
+    return city.create_city_road()
+
+
+def add_agents(scenario_subtree, options, seed):
+    """Add the agents of a scenario variant to its road."""
+    import delphyne.blackboard.providers
+
+    if options.scenario == 'mali':
+        road = mali.get_known_road(options.road_name)
+        lane_provider = delphyne.blackboard.providers.LaneLocationProvider(
+            distance_between_agents=1.0, seed=seed
+        )
+        return mali.add_mali_agent(
+            scenario_subtree, road['lane_position'], road['agent_type'],
+            road['moving_forward'], lane_provider.random_lane
+        )
+    if options.scenario == 'gazoo':
+        lanes = gazoo.get_scenario_subtree_config(options.maliput_backend).lanes
+        return gazoo.add_agents_to_scenario(scenario_subtree, options.num_cars, lanes)
+    return city.add_city_agents(
+        scenario_subtree, options.num_rail_cars, options.num_cars, seed=seed
+    )
+
+
+def run_variant(variant, options):
+    """
+    Set up and run a scenario variant, as fast as possible. Meant to be
+    run in a worker process of its own.
+    Args:
+        variant: variant number, seeds the placement of the agents
+        options: the parsed command line arguments
+    Returns:
+        dict: variant number, setup and run wall times (s), achieved
+              realtime rate, peak RSS and final PSS (MiB)
+    """
+    import delphyne.behaviours
+    import delphyne.trees
+
+    from .behaviours.roads import PreloadedRoad
+
+    start = time.perf_counter()
+    if _preloaded_road is not None:
+        scenario_subtree = delphyne.behaviours.roads.Road()
+        scenario_subtree.add_child(PreloadedRoad(_preloaded_road))
+    else:
+        scenario_subtree = create_road(options)
+    simulation_tree = delphyne.trees.BehaviourTree(
+        root=add_agents(scenario_subtree, options, seed=variant)
+    )
+    time_step = 0.01
+    simulation_tree.setup(
+        realtime_rate=0., start_paused=False, log=False,
+        logfile_name='', time_step=time_step
+    )
+    setup_time = time.perf_counter() - start
+
+    runner = simulation_tree.runner
+    start = time.perf_counter()
+    for _ in range(int(options.duration / time_step)):
+        simulation_tree.tick()
+        runner.run_sync_for(time_step)
+    wall_time = time.perf_counter() - start
+    return {
+        'variant': variant,
+        'setup_time': setup_time,
+        'wall_time': wall_time,
+        'realtime_rate': options.duration / wall_time if wall_time > 0. else 0.,
+        'peak_rss': benchmarking.peak_rss(),
+        'pss': benchmarking.proportional_set_size(),
+    }
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Scenario Variants",
+            """
+Runs many variants of a scenario, differing in the placement of their
+agents, on a single road. The road is loaded once, in this process, and
+every variant runs in a worker process forked from it, inheriting the
+road copy-on-write and building its own agents on top.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "scenario", choices=SCENARIOS,
+        help="Scenario to run variants of."
+    )
+    parser.add_argument(
+        "-r", "--road-name", default="Town01",
+        help="Well known malidrive road, for the mali scenario (default: Town01)."
+    )
+    parser.add_argument(
+        "-m", "--maliput-backend", default="maliput_multilane",
+        choices=[backend.value for backend in gazoo.MaliputBackend],
+        help="Road backend, for the gazoo scenario (default: maliput_multilane)."
+    )
+    parser.add_argument(
+        "-n", "--num-cars", default=5, type=int,
+        help="The number of MOBIL cars, for the gazoo and city scenarios (default: 5)."
+    )
+    parser.add_argument(
+        "--num-rail-cars", default=20, type=int,
+        help="The number of rail cars, for the city scenario (default: 20)."
+    )
+    parser.add_argument(
+        "-V", "--variants", default=8, type=int,
+        help="The number of variants to run (default: 8)."
+    )
+    parser.add_argument(
+        "-d", "--duration", default=5.0, type=float,
+        help="Simulation time each variant runs for (sec) (default: 5s)."
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=0, type=int,
+        help=("Number of variants to run in parallel. Zero uses all available "
+              "cores (default: 0)")
+    )
+    parser.add_argument(
+        "--no-preload", action="store_true", default=False,
+        help="Load the road in every worker instead, for comparison."
+    )
+    parser.add_argument(
+        "-o", "--output", default="",
+        help="File to write results to, as JSON (default: none)"
+    )
+    args = parser.parse_args()
+    if args.road_name not in mali.KNOWN_ROADS:
+        parser.error("unknown road {}".format(args.road_name))
+    return args
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    global _preloaded_road
+
+    args = parse_arguments()
+
+    load_time = 0.
+    if not args.no_preload:
+        start = time.perf_counter()
+        _preloaded_road = preload_road(create_road(args))
+        load_time = time.perf_counter() - start
+        print("Road loaded in {:.2f}s ({:.1f} MiB).".format(
+            load_time, benchmarking.peak_rss()))
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    # Each variant consumes the road it is handed, so every one of them
+    # gets a freshly forked worker.
+    context = multiprocessing.get_context('fork')
+    start = time.perf_counter()
+    with context.Pool(jobs, maxtasksperchild=1) as pool:
+        results = sorted(
+            pool.imap_unordered(functools.partial(run_variant, options=args),
+                                range(args.variants)),
+            key=lambda result: result['variant']
+        )
+    total_time = time.perf_counter() - start
+
+    print("{:>8} {:>10} {:>10} {:>8} {:>10} {:>10}".format(
+        'variant', 'setup (s)', 'run (s)', 'rt rate', 'peak MiB', 'PSS MiB'))
+    for result in results:
+        print("{variant:>8} {setup_time:>10.2f} {wall_time:>10.2f} {realtime_rate:>8.2f} "
+              "{peak_rss:>10.1f} {pss:>10}".format(
+                  **dict(result, pss='-' if result['pss'] is None
+                         else '{:.1f}'.format(result['pss']))))
+    total_pss = sum(result['pss'] or 0. for result in results)
+    print("{} variants in {:.2f}s, {:.1f} MiB PSS across workers{}.".format(
+        len(results), total_time, total_pss,
+        ", road preloaded in {:.2f}s".format(load_time) if not args.no_preload else ""))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'preloaded': not args.no_preload, 'load_time': load_time,
+                       'total_time': total_time, 'variants': results},
+                      output_file, indent=2)
+        print("Results written to {}.".format(args.output))
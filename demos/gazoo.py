@@ -37,18 +37,12 @@ The gazoo demo.
 # Imports
 ##############################################################################
 
-
 import os.path
 from dataclasses import dataclass
 from enum import Enum
 
-import delphyne.behaviours
-import delphyne.trees
-import delphyne_gui.utilities
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
+from . import resources
 
 ##############################################################################
 # Supporting Classes & Methods
@@ -62,22 +56,12 @@ class MaliputBackend(Enum):
 
 def get_maliput_osm_circuit():
     """Resolve the path for the circuit map against maliput_osm resources root location."""
-    root = delphyne.utilities.get_from_env_or_fail('MALIPUT_OSM_RESOURCE_ROOT')
-    filename = "circuit.osm"
-    for root in root.split(':'):
-        resolved_path = os.path.join(root, 'resources', 'osm', filename)
-        if os.path.exists(resolved_path):
-            return resolved_path
-    return ''
+    return resources.get_maliput_osm_resource("circuit.osm")
 
 
 def get_delphyne_gui_circuit():
     """Resolve the path for the circuit map against delphyne_gui resources root location."""
-    filename = "roads/circuit.yaml"
-    resolved_path = delphyne_gui.utilities.get_delphyne_gui_resource(filename)
-    if os.path.exists(resolved_path):
-        return resolved_path
-    return ''
+    return resources.get_delphyne_gui_resource("roads/circuit.yaml")
 
 
 @dataclass
@@ -129,6 +113,8 @@ See also https://toyotagazooracing.com/
 
 def add_agents_to_scenario(scenario_subtree, mobil_cars_num, lanes):
     "Adds agents to the scenario subtree."
+    import delphyne.behaviours
+
     # Setup railcar 1
     railcar_speed = 4.0  # (m/s)
     railcar_s = 0.0      # (m)
@@ -195,16 +181,16 @@ def add_agents_to_scenario(scenario_subtree, mobil_cars_num, lanes):
     return scenario_subtree
 
 
-def create_gazoo_scenario_subtree(backend, mobil_cars_num):
-    "Creates the Gazoo scenario subtree."
-    print("Creating Gazoo scenario subtree...")
+def create_gazoo_road(backend, headless=False):
+    "Creates the Gazoo circuit road, with no agents on it."
+    import delphyne.behaviours
+
     config = get_scenario_subtree_config(backend)
     if not os.path.isfile(config.circuit_filepath):
         print("Required map 'circuit' not found for the backend: {}"
               .format(backend))
         quit()
-    features = delphyne.roads.ObjFeatures()
-    features.draw_elevation_bounds = False
+    features = helpers.create_road_features(headless, draw_elevation_bounds=False)
     if(MaliputBackend(backend) == MaliputBackend.MALIPUT_MULTILANE):
         scenario_subtree = delphyne.behaviours.roads.Multilane(
             file_path=config.circuit_filepath,
@@ -222,8 +208,15 @@ def create_gazoo_scenario_subtree(backend, mobil_cars_num):
     else:
         print("Backend {} not supported".format(backend))
         quit()
+    return scenario_subtree
 
-    return add_agents_to_scenario(scenario_subtree, mobil_cars_num, config.lanes)
+
+def create_gazoo_scenario_subtree(backend, mobil_cars_num, headless=False):
+    "Creates the Gazoo scenario subtree."
+    print("Creating Gazoo scenario subtree...")
+    scenario_subtree = create_gazoo_road(backend, headless)
+    lanes = get_scenario_subtree_config(backend).lanes
+    return add_agents_to_scenario(scenario_subtree, mobil_cars_num, lanes)
 
 
 ##############################################################################
@@ -233,6 +226,8 @@ def create_gazoo_scenario_subtree(backend, mobil_cars_num):
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     args = parse_arguments()
 
     if args.num_cars > 6 or args.num_cars < 0:
@@ -243,7 +238,9 @@ def main():
     maliput_backend = args.maliput_backend
 
     simulation_tree = delphyne.trees.BehaviourTree(
-        root=create_gazoo_scenario_subtree(maliput_backend, mobil_cars_num)
+        root=create_gazoo_scenario_subtree(
+            maliput_backend, mobil_cars_num, helpers.is_headless(args)
+        )
     )
 
     sim_runner_time_step = 0.015
@@ -256,17 +253,6 @@ def main():
     )
 
     tree_time_step = 0.03
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
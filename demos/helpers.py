@@ -41,6 +41,7 @@
 ##############################################################################
 
 import argparse
+import time
 
 import delphyne.cmdline as cmdline
 
@@ -99,4 +100,211 @@ def create_argument_parser(title, content, default_duration=-1.0):
                              'first at env `DELPHYNE_GUI_RESOURCE_ROOT/layouts` '
                              'location and then at the execution location. '
                              '(default: layout_with_teleop.config)')
+    parser.add_argument('--batch', action='store_true',
+                        default=False, help=('Run simulation as fast as possible, '
+                                             'with no visualizer and no wall clock '
+                                             'pacing (default: False)'))
+    parser.add_argument('--asyncio', action='store_true',
+                        default=False, help=('Drive the simulation from an asyncio '
+                                             'event loop, along with any side tasks '
+                                             'of the demo. Ignored in batch mode '
+                                             '(default: False)'))
     return parser
+
+
+def add_handler_budget_arguments(parser):
+    """
+    Populate an argument parser with the arguments that hold tick handlers
+    to a budget, see create_tick_handler_dispatcher().
+    Args:
+        parser: the argument parser to populate
+    """
+    parser.add_argument(
+        "--handler-budget", default=None, type=float,
+        help=("Per tick budget of each tick handler (ms), handlers over it "
+              "are reported (default: no budget).")
+    )
+    parser.add_argument(
+        "--demote-slow-handlers", default=0, type=int, metavar="N",
+        help=("Run tick handlers over budget every N ticks rather than "
+              "only reporting them, requires --handler-budget (default: never).")
+    )
+
+
+def check_handler_budget_arguments(parser, args):
+    """
+    Check the arguments added by add_handler_budget_arguments(), exiting
+    with a usage error if they do not go together.
+    Args:
+        parser: the argument parser the arguments were parsed by
+        args: the parsed arguments
+    """
+    if args.demote_slow_handlers < 0:
+        parser.error("--demote-slow-handlers must not be negative")
+    if args.demote_slow_handlers and args.handler_budget is None:
+        parser.error("--demote-slow-handlers requires --handler-budget")
+
+
+def create_tick_handler_dispatcher(args):
+    """
+    Create a tick handler dispatcher that holds handlers to the budget
+    given by the arguments added by add_handler_budget_arguments().
+    Args:
+        args: the parsed arguments
+    Returns:
+        instrumentation.TickHandlerDispatcher: the dispatcher, to add
+        handlers to
+    """
+    from . import instrumentation
+
+    return instrumentation.TickHandlerDispatcher(
+        budget=args.handler_budget,
+        policy='demote' if args.demote_slow_handlers else 'warn',
+        demote_every=args.demote_slow_handlers
+    )
+
+
+def is_headless(args):
+    """
+    Whether a simulation will be run with nobody watching, given the
+    arguments parsed by a create_argument_parser() parser.
+    """
+    return args.bare or args.batch
+
+
+def create_road_features(headless=False, **features):
+    """
+    Create the features of a road mesh, leaving the decorations (arrows
+    and stripes) off the mesh of a road nobody will watch.
+    Args:
+        headless: whether the road will be rendered at all
+        features: features to set, defaults are kept for the rest
+    Returns:
+        delphyne.roads.ObjFeatures: the features of the road mesh
+    """
+    import delphyne.roads
+
+    obj_features = delphyne.roads.ObjFeatures()
+    for name, value in features.items():
+        setattr(obj_features, name, value)
+    if headless:
+        obj_features.draw_arrows = False
+        obj_features.draw_stripes = False
+    return obj_features
+
+
+##############################################################################
+# Simulation execution
+##############################################################################
+
+
+def run_batch_simulation(simulation_tree, duration, tree_time_step):
+    """
+    Run a simulation as fast as possible, stepping the behaviour tree
+    and the simulation runner back to back, with no sleeping in between
+    and no visualizer. Realtime rate changes made by tick handlers are
+    undone before the next step. Simulated seconds per wall second are
+    reported at the end.
+    Args:
+        simulation_tree: a behaviour tree that has already been setup
+        duration: length of the simulation (s)(endless if -ve)
+        tree_time_step: behaviour tree tick period (s)
+    """
+    runner = simulation_tree.runner
+    runner.set_realtime_rate(0.)
+    if runner.is_simulation_paused():
+        runner.unpause_simulation()
+    number_of_iterations = int(duration / tree_time_step)
+    if duration < 0:
+        print("Running batch simulation indefinitely.")
+    else:
+        print("Running batch simulation for {0} seconds.".format(duration))
+
+    simulation = runner.get_simulation()
+    initial_sim_time = simulation.get_current_time()
+    start = time.perf_counter()
+    iteration = 0
+    try:
+        while not simulation_tree.interrupt_tick_tocking and (
+                duration < 0 or iteration < number_of_iterations):
+            simulation_tree.tick()
+            if runner.get_realtime_rate() != 0.:
+                runner.set_realtime_rate(0.)
+            runner.run_sync_for(tree_time_step)
+            iteration += 1
+    except KeyboardInterrupt:
+        print("Batch simulation interrupted.")
+    wall_time = time.perf_counter() - start
+    sim_time = simulation.get_current_time() - initial_sim_time
+    print("Simulated {0:.2f}s in {1:.2f}s of wall time "
+          "({2:.2f} simulated seconds per wall second)."
+          .format(sim_time, wall_time, sim_time / wall_time if wall_time > 0. else 0.))
+
+
+def run_async_simulation(simulation_tree, tree_time_step, number_of_iterations=-1, tasks=()):
+    """
+    Run a simulation from an asyncio event loop, paced at the runner's
+    realtime rate, along with side tasks.
+    Args:
+        simulation_tree: a behaviour tree that has already been setup
+        tree_time_step: behaviour tree tick period (s)
+        number_of_iterations: number of ticks, endless if negative
+        tasks: callables returning coroutines to run along the simulation
+    """
+    import asyncio
+
+    from . import async_tick
+
+    driver = async_tick.AsyncTickTock(simulation_tree, tree_time_step)
+    try:
+        asyncio.run(async_tick.run_concurrently(
+            driver, number_of_iterations, [task() for task in tasks]
+        ))
+    except KeyboardInterrupt:
+        print("Simulation interrupted.")
+
+
+def run_simulation(simulation_tree, args, tree_time_step, tasks=(), on_finish=None, **kwargs):
+    """
+    Run a simulation as requested by the common arguments of the demos,
+    either in batch mode or interactively.
+    Args:
+        simulation_tree: a behaviour tree that has already been setup
+        args: arguments parsed by a create_argument_parser() parser
+        tree_time_step: behaviour tree tick period (s)
+        tasks: callables returning coroutines to run along the simulation,
+               when driven from an asyncio event loop
+        on_finish: callable taking the behaviour tree, called once the
+                   simulation is over, while the visualizer is still up
+        kwargs: additional keyword arguments for launch_interactive_simulation()
+    """
+    if args.batch:
+        run_batch_simulation(simulation_tree, args.duration, tree_time_step)
+        if on_finish is not None:
+            on_finish(simulation_tree)
+        return
+
+    from delphyne_gui.utilities import launch_interactive_simulation
+
+    with launch_interactive_simulation(
+        simulation_tree.runner, layout=args.layout, bare=args.bare, **kwargs
+    ) as launcher:
+        if args.duration < 0:
+            # run indefinitely
+            print("Running simulation indefinitely.")
+            number_of_iterations = -1
+        else:
+            # run for a finite time
+            print("Running simulation for {0} seconds.".format(args.duration))
+            number_of_iterations = int(args.duration / tree_time_step)
+        if args.asyncio:
+            run_async_simulation(simulation_tree, tree_time_step, number_of_iterations, tasks)
+        elif number_of_iterations < 0:
+            simulation_tree.tick_tock(period=tree_time_step)
+        else:
+            simulation_tree.tick_tock(
+                period=tree_time_step, number_of_iterations=number_of_iterations
+            )
+        if on_finish is not None:
+            on_finish(simulation_tree)
+        launcher.terminate()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Reports what importing each demo module costs, module by module, as
+measured by the interpreter's own import profiler (-X importtime).
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import os
+import pkgutil
+import re
+import subprocess
+import sys
+
+import delphyne.cmdline as cmdline
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+# Modules that are expensive to load, and that no demo should load
+# before it has parsed its arguments.
+HEAVY_MODULES = (
+    'delphyne.behaviours',
+    'delphyne.blackboard',
+    'delphyne.maliput',
+    'delphyne.roads',
+    'delphyne.trees',
+    'delphyne.utilities',
+    'delphyne_gui',
+    'numpy',
+    'py_trees',
+)
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def get_demo_modules():
+    """Names of all modules in this package."""
+    package_path = os.path.dirname(os.path.abspath(__file__))
+    return sorted(
+        '{}.{}'.format(__package__, module.name)
+        for module in pkgutil.iter_modules([package_path])
+        if not module.name.startswith('_')
+    )
+
+
+def parse_importtime(output):
+    """
+    Parse the output of an interpreter run with -X importtime.
+    Args:
+        output: the interpreter's standard error output
+    Returns:
+        list: (module name, self time (us), cumulative time (us), nesting
+              depth) tuples, in the order imports completed
+    """
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_time, cumulative_time, indent, name = match.groups()
+            entries.append((name, int(self_time), int(cumulative_time), len(indent) // 2))
+    return entries
+
+
+def measure_imports(module_name):
+    """
+    Import a module in a fresh interpreter and profile it.
+    Args:
+        module_name: fully qualified name of the module to import
+    Returns:
+        list: import entries, see parse_importtime()
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module_name],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError('Failed to import {}:\n{}'.format(
+            module_name, process.stderr[-2000:]))
+    return parse_importtime(process.stderr)
+
+
+def get_nested_imports(entries, module_name):
+    """
+    Get the imports a module triggered, which the profiler lists right
+    before the module itself and nested deeper than it.
+    Args:
+        entries: import entries, see parse_importtime()
+        module_name: fully qualified name of the module
+    Returns:
+        tuple: the module's own entry, and the list of its nested entries
+    """
+    for index, entry in enumerate(entries):
+        if entry[0] == module_name:
+            start = index
+            while start > 0 and entries[start - 1][3] > entry[3]:
+                start -= 1
+            return entry, entries[start:index]
+    return (module_name, 0, 0, 0), []
+
+
+def is_within(name, packages):
+    """Whether a module is any of the given modules or packages, or within them."""
+    return any(name == package or name.startswith(package + '.') for package in packages)
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Import Report",
+            """
+Imports each demo module in a fresh interpreter and reports the
+cumulative cost of the module and of its most expensive imports. Fails
+if any demo module loads one of the heavy modules on import, or takes
+longer than a given budget to import.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "modules", nargs="*", metavar="module",
+        help="Modules to be imported (default: all demo modules)."
+    )
+    parser.add_argument(
+        "-t", "--top", default=5, type=int,
+        help="Number of most expensive imports to list per module (default: 5)."
+    )
+    parser.add_argument(
+        "--heavy", default=",".join(HEAVY_MODULES),
+        help="Comma separated modules that must not be imported (default: {}).".format(
+            ",".join(HEAVY_MODULES))
+    )
+    parser.add_argument(
+        "--budget", default=0., type=float,
+        help="Maximum import time per module (ms), zero for none (default: 0)."
+    )
+    return parser.parse_args()
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    heavy_modules = [name for name in args.heavy.split(',') if name]
+    failures = []
+    for module_name in args.modules or get_demo_modules():
+        entries = measure_imports(module_name)
+        module_entry, nested_entries = get_nested_imports(entries, module_name)
+        total = module_entry[2]
+        print("{} {:.1f} ms ({} modules)".format(
+            module_name, total / 1000., len(nested_entries) + 1))
+        imports = sorted(nested_entries, key=lambda entry: entry[2], reverse=True)
+        for name, self_time, cumulative_time, _ in imports[:args.top]:
+            print("    {:<48} {:>10.1f} ms {:>10.1f} ms self".format(
+                name, cumulative_time / 1000., self_time / 1000.))
+        loaded = sorted({name for name, _, _, _ in entries if is_within(name, heavy_modules)})
+        if loaded:
+            failures.append("{} loads {}".format(module_name, ", ".join(loaded)))
+        if 0. < args.budget < total / 1000.:
+            failures.append("{} takes {:.1f} ms to import, over the {:.1f} ms budget".format(
+                module_name, total / 1000., args.budget))
+
+    for failure in failures:
+        print("FAILED: " + failure)
+    sys.exit(1 if failures else 0)
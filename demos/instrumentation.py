@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Lightweight instrumentation for simulation ticks, cheap enough
+to be left enabled in production runs.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import array
+import collections
+import functools
+import time
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class TickLatencyHistogram(object):
+    """
+    A fixed-memory, log-linear histogram of latencies in nanoseconds.
+
+    Values below 2^`precision_bits` ns are counted exactly. Above that,
+    every power of two is split into 2^(`precision_bits` - 1) buckets,
+    bounding the relative error of any reported value to 2^(1 - `precision_bits`).
+    Values beyond `max_value` ns are clamped to the last bucket, but the
+    maximum is always tracked exactly.
+
+    All storage is allocated on construction: recording a value only
+    updates counters in place.
+    """
+
+    def __init__(self, precision_bits=7, max_value=2**40):
+        self._precision_bits = precision_bits
+        self._sub_bucket_count = 1 << precision_bits
+        self._half_sub_bucket_count = self._sub_bucket_count >> 1
+        self._max_index = self._index_of(max_value)
+        self._counts = array.array('Q', bytes(8 * (self._max_index + 1)))
+        self.reset()
+
+    def reset(self):
+        """Clear all values"""
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self.count = 0
+        self.max = 0
+
+    def _index_of(self, value):
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._precision_bits
+        return (self._sub_bucket_count + (shift - 1) * self._half_sub_bucket_count +
+                (value >> shift) - self._half_sub_bucket_count)
+
+    def _value_at(self, index):
+        """Middle value of the index-th bucket."""
+        if index < self._sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self._sub_bucket_count, self._half_sub_bucket_count)
+        shift += 1
+        lowest_value = (self._half_sub_bucket_count + offset) << shift
+        return lowest_value + ((1 << shift) >> 1)
+
+    def record(self, value):
+        """Record a latency value (ns)"""
+        index = self._index_of(value)
+        if index > self._max_index:
+            index = self._max_index
+        self._counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Compute the q-th percentile of the recorded values.
+        Args:
+            q: percentile to compute, in the [0, 100] range
+        Returns:
+            the q-th percentile value (ns), or 0 if nothing was recorded
+        """
+        if self.count == 0:
+            return 0
+        if q >= 100.:
+            return self.max
+        rank = max(1, int(round(q / 100. * self.count)))
+        cumulative_count = 0
+        for index, count in enumerate(self._counts):
+            cumulative_count += count
+            if cumulative_count >= rank:
+                return min(self._value_at(index), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Summarize the recorded values.
+        Returns:
+            dict: sample count plus p50, p90, p99 and max latencies (ms)
+        """
+        return {
+            'count': self.count,
+            'p50': self.percentile(50) * 1e-6,
+            'p90': self.percentile(90) * 1e-6,
+            'p99': self.percentile(99) * 1e-6,
+            'max': self.max * 1e-6,
+        }
+
+
+class TickLatencyStats(object):
+    """
+    Keeps latency statistics of the simulation ticks as seen from the outside
+    world, i.e. the time in between consecutive post tick handler calls. The
+    first `warmup_ticks` are kept apart from the steady state ones, so that
+    startup costs do not skew the latter. Optionally, statistics are printed
+    to stdout every `report_every` ticks.
+
+    Attach it to a behaviour tree with:
+
+        simulation_tree.add_post_tick_handler(stats.post_tick_handler)
+    """
+
+    def __init__(self, warmup_ticks=50, report_every=0):
+        """Just init the stats"""
+        self.warmup = TickLatencyHistogram()
+        self.steady_state = TickLatencyHistogram()
+        self._warmup_ticks = warmup_ticks
+        self._report_every = report_every
+        self._ticks = 0
+        self._last_tick_time = None
+
+    def reset(self):
+        """Clear all values"""
+        self.warmup.reset()
+        self.steady_state.reset()
+        self._ticks = 0
+        self._last_tick_time = None
+
+    def start(self):
+        """Record the time when we start measuring"""
+        self._last_tick_time = time.perf_counter_ns()
+
+    def record_tick(self):
+        """A simulation tick happened. Record it."""
+        now = time.perf_counter_ns()
+        if self._last_tick_time is None:
+            self._last_tick_time = now
+            return
+        latency = now - self._last_tick_time
+        self._last_tick_time = now
+        self._ticks += 1
+        if self._ticks <= self._warmup_ticks:
+            self.warmup.record(latency)
+            return
+        self.steady_state.record(latency)
+        if self._report_every and self.steady_state.count % self._report_every == 0:
+            self.print_stats()
+
+    def post_tick_handler(self, behaviour_tree):
+        """Post tick handler to attach to a behaviour tree."""
+        self.record_tick()
+
+    def summary(self):
+        """
+        Summarize the tick latencies.
+        Returns:
+            dict: warmup and steady state summaries, see
+                  TickLatencyHistogram.summary()
+        """
+        return {
+            'warmup': self.warmup.summary(),
+            'steady_state': self.steady_state.summary(),
+        }
+
+    def print_stats(self):
+        """Print the stats"""
+        for phase, summary in self.summary().items():
+            if not summary['count']:
+                continue
+            print("Simulation step latency ({phase}, {count} steps): "
+                  "p50 {p50:.3f}ms, p90 {p90:.3f}ms, p99 {p99:.3f}ms, "
+                  "max {max:.3f}ms".format(phase=phase, **summary))
+
+
+def handler_name(handler):
+    """A readable name for a tick handler."""
+    if isinstance(handler, functools.partial):
+        handler = handler.func
+    return getattr(handler, '__qualname__', None) or repr(handler)
+
+
+class TimedHandler(object):
+    """
+    A tick handler along with its cost, kept both as a latency histogram
+    and as a rolling mean over the last `window` calls. Handlers that are
+    not `demotable` keep running every tick, whatever their cost.
+    """
+
+    def __init__(self, handler, window=100, demotable=True):
+        self.handler = handler
+        self.demotable = demotable
+        self.name = handler_name(handler)
+        self.latencies = TickLatencyHistogram()
+        self.every = 1
+        self.over_budget = False
+        self._recent = collections.deque(maxlen=window)
+        self._recent_sum = 0
+
+    def record(self, latency):
+        """Record the latency of a call (ns)"""
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_sum -= self._recent[0]
+        self._recent.append(latency)
+        self._recent_sum += latency
+        self.latencies.record(latency)
+
+    def is_warm(self):
+        """Whether enough calls were made to trust the rolling mean."""
+        return len(self._recent) == self._recent.maxlen
+
+    def rolling_mean(self):
+        """Mean latency over the last calls (ns), zero if none."""
+        return self._recent_sum / len(self._recent) if self._recent else 0.
+
+
+class TickHandlerDispatcher(object):
+    """
+    Runs a set of tick handlers, timing each of them. Handlers whose
+    rolling mean cost exceeds a per tick budget are either reported, once,
+    or demoted to run every `demote_every` ticks from then on. Handlers
+    that must not miss a tick, e.g. collision checks, can be exempted
+    from demotion, and are then only ever reported.
+
+    Register it as the sole pre (or post) tick handler of a behaviour tree:
+
+        dispatcher = TickHandlerDispatcher(budget=1.)
+        dispatcher.add(random_print)
+        simulation_tree.add_pre_tick_handler(dispatcher)
+
+    Args:
+        budget: per tick budget of each handler (ms), None for no budget
+        policy: 'warn' to only report handlers over budget, 'demote' to
+                also run them less often
+        demote_every: ticks in between runs of demoted handlers
+        window: number of calls the rolling mean cost is taken over
+    """
+
+    def __init__(self, budget=None, policy='warn', demote_every=10, window=100):
+        if policy not in ('warn', 'demote'):
+            raise ValueError("unknown policy {}".format(policy))
+        self.budget = budget
+        self.policy = policy
+        self.demote_every = demote_every
+        self.window = window
+        self.handlers = []
+        self.ticks = 0
+
+    def add(self, handler, demotable=True):
+        """
+        Add a tick handler.
+        Args:
+            handler: a callable taking the behaviour tree
+            demotable: whether the handler may be demoted when over budget
+        Returns:
+            TimedHandler: the handler along with its cost
+        """
+        timed_handler = TimedHandler(handler, self.window, demotable)
+        self.handlers.append(timed_handler)
+        return timed_handler
+
+    def __call__(self, behaviour_tree):
+        for timed_handler in self.handlers:
+            if self.ticks % timed_handler.every:
+                continue
+            start = time.perf_counter_ns()
+            timed_handler.handler(behaviour_tree)
+            timed_handler.record(time.perf_counter_ns() - start)
+            if self.budget is not None and not timed_handler.over_budget:
+                self._enforce_budget(timed_handler)
+        self.ticks += 1
+
+    def _enforce_budget(self, timed_handler):
+        if not timed_handler.is_warm():
+            return
+        cost = timed_handler.rolling_mean() * 1e-6
+        if cost <= self.budget:
+            return
+        timed_handler.over_budget = True
+        if self.policy == 'demote' and timed_handler.demotable:
+            timed_handler.every = self.demote_every
+            print("Tick handler {} takes {:.3f}ms, over the {:.3f}ms budget, "
+                  "now running every {} ticks.".format(
+                      timed_handler.name, cost, self.budget, self.demote_every))
+        else:
+            print("Tick handler {} takes {:.3f}ms, over the {:.3f}ms budget.".format(
+                timed_handler.name, cost, self.budget))
+
+    def print_stats(self):
+        """Print the cost of each handler"""
+        for timed_handler in self.handlers:
+            summary = timed_handler.latencies.summary()
+            demoted = ""
+            if timed_handler.over_budget:
+                demoted = ", over budget"
+            if timed_handler.every > 1:
+                demoted += ", every {} ticks".format(timed_handler.every)
+            print("Tick handler {name} ({count} calls{demoted}): "
+                  "p50 {p50:.3f}ms, p90 {p90:.3f}ms, p99 {p99:.3f}ms, "
+                  "max {max:.3f}ms".format(
+                      name=timed_handler.name, demoted=demoted, **summary))
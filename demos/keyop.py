@@ -37,11 +37,6 @@ A keyop demo.
 # Imports
 ##############################################################################
 
-import delphyne.trees
-import delphyne.behaviours
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
 from . import keyboard_handler
 
@@ -91,6 +86,8 @@ keyboard on the GUI's teleop widget. In the console, we can toggle
 
 
 def create_scenario_subtree():
+    import delphyne.behaviours
+
     scenario_subtree = delphyne.behaviours.roads.Road()
     scenario_subtree.add_child(
         delphyne.behaviours.agents.SimpleCar(
@@ -105,6 +102,8 @@ def create_scenario_subtree():
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     args = parse_arguments()
 
     simulation_tree = delphyne.trees.BehaviourTree(
@@ -137,17 +136,6 @@ def main():
           "************************************************************\n")
 
     tree_time_step = 0.02
-    with launch_interactive_simulation(
-            simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
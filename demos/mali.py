@@ -39,15 +39,8 @@ The maliput_malidrive demo.
 
 import os.path
 
-import delphyne.trees
-import delphyne.behaviours
-import delphyne.blackboard.providers
-import delphyne.roads as delphyne_roads
-import delphyne.utilities as utilities
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
+from . import resources
 
 ##############################################################################
 # Supporting Classes & Methods
@@ -279,24 +272,78 @@ found in the current working directory.
     parser.add_argument(
         '-at', '--agent_type', default='RailCar', help=argument_help
     )
-    return parser.parse_args()
 
+    parser.add_argument(
+        '--road-cache', action='store_true', default=False,
+        help=('Look the lane table of the road up in, and store it to, the road cache, '
+              'for --num-agents to spread agents with.')
+    )
 
-def get_malidrive_resource(path):
-    """Resolve the path against malidrive resources root location."""
-    root = utilities.get_from_env_or_fail('MALIPUT_MALIDRIVE_RESOURCE_ROOT')
-    for root in root.split(':'):
-        resolved_path = os.path.join(root, 'resources', path)
-        if os.path.exists(resolved_path):
-            return resolved_path
-    return ''
+    parser.add_argument(
+        '-N', '--num-agents', default=0, type=int,
+        help=('Number of agents to spread evenly over the lanes of the road that '
+              'flow along their reference line, instead of the single agent of '
+              'the road (default: 0).')
+    )
+    args = parser.parse_args()
+    if args.road_cache and args.num_agents <= 0:
+        parser.error("--road-cache requires --num-agents")
+    return args
 
 
-def create_mali_scenario_subtree(file_path, yaml_file_path, features,
-                                 lane_position, agent_type, direction_of_travel,
-                                 lane_id, linear_tolerance,
-                                 angular_tolerance=1e-3):
-    scenario_subtree = delphyne.behaviours.roads.Malidrive(
+def get_known_road(road_name, yaml_name=''):
+    """
+    Get the configuration of a well known road, with its file paths
+    resolved against malidrive resources root location.
+    Args:
+        road_name: name of the road in KNOWN_ROADS
+        yaml_name: name of the rules file to use when the road has none
+    Returns:
+        dict: a copy of the road configuration
+    """
+    road = dict(KNOWN_ROADS[road_name])
+    if 'file_path' not in road:
+        road['file_path'] = os.path.join(
+            'odr', road_name + '.xodr'
+        )
+    if 'yaml_file_path' not in road:
+        road['yaml_file_path'] = os.path.join(
+            'odr', yaml_name + '.yaml'
+        )
+    if not os.path.isabs(road['file_path']):
+        road['file_path'] = resources.get_malidrive_resource(road['file_path'])
+    if not os.path.isabs(road['yaml_file_path']):
+        road['yaml_file_path'] = resources.get_malidrive_resource(road['yaml_file_path'])
+    if 'agent_type' not in road:
+        road['agent_type'] = "RailCar"
+    if 'angular_tolerance' not in road:
+        road['angular_tolerance'] = 1e-3
+    return road
+
+
+def create_road_features(headless=False):
+    """
+    Create the features of the malidrive road mesh to be rendered.
+    Args:
+        headless: whether the road will be rendered at all, in which case
+                  no decorations are drawn on the road mesh
+    Returns:
+        delphyne.roads.ObjFeatures: the features of the road mesh
+    """
+    return helpers.create_road_features(
+        headless,
+        draw_elevation_bounds=False,
+        draw_lane_haze=False,
+        draw_branch_points=False
+    )
+
+
+def create_malidrive_road(file_path, yaml_file_path, features,
+                          linear_tolerance, angular_tolerance=1e-3):
+    """Create a malidrive road behaviour, with no agents on it."""
+    import delphyne.behaviours
+
+    return delphyne.behaviours.roads.Malidrive(
         file_path=file_path,
         rule_registry_file_path=yaml_file_path,
         road_rulebook_file_path=yaml_file_path,
@@ -309,6 +356,25 @@ def create_mali_scenario_subtree(file_path, yaml_file_path, features,
         angular_tolerance=angular_tolerance,
     )
 
+
+def create_mali_scenario_subtree(file_path, yaml_file_path, features,
+                                 lane_position, agent_type, direction_of_travel,
+                                 lane_id, linear_tolerance,
+                                 angular_tolerance=1e-3):
+    scenario_subtree = create_malidrive_road(
+        file_path, yaml_file_path, features,
+        linear_tolerance, angular_tolerance=angular_tolerance
+    )
+    return add_mali_agent(
+        scenario_subtree, lane_position, agent_type, direction_of_travel, lane_id
+    )
+
+
+def add_mali_agent(scenario_subtree, lane_position, agent_type,
+                   direction_of_travel, lane_id):
+    """Add the rail car of the demo to a road."""
+    import delphyne.behaviours
+
     if agent_type == 'RuleRailCar':
         scenario_subtree.add_child(
             delphyne.behaviours.agents.RuleRailCar(
@@ -333,6 +399,60 @@ def create_mali_scenario_subtree(file_path, yaml_file_path, features,
         )
     return scenario_subtree
 
+
+def add_lane_agents(scenario_subtree, num_agents, agent_type, speed=15.0, lane_table=None):
+    """
+    Add rail cars spread evenly over the lanes of a road, placed once the
+    road is loaded, see spawning.LaneAgentsBatch.
+    Args:
+        scenario_subtree: the road behaviour to add the agents to
+        num_agents: number of agents
+        agent_type: either 'RailCar' or 'RuleRailCar'
+        speed: speed of the agents (m/s)
+        lane_table: callable returning the lane table of the road, e.g.
+                    a RoadCacheProbe's, None to walk the road geometry
+    Returns:
+        the road behaviour
+    """
+    import delphyne.behaviours
+
+    from . import spawning
+
+    agent_class = delphyne.behaviours.agents.RuleRailCar \
+        if agent_type == 'RuleRailCar' else delphyne.behaviours.agents.RailCar
+    batch = spawning.LaneAgentsBatch(num_agents, lane_table=lane_table)
+    for i in range(num_agents):
+        scenario_subtree.add_child(
+            agent_class(
+                name='rail-car-{}'.format(i),
+                lane_id=batch.lane_id(i),
+                longitudinal_position=batch.longitudinal_position(i),
+                lateral_offset=0.,
+                speed=speed,
+                direction_of_travel=True
+            )
+        )
+    return scenario_subtree
+
+
+def create_lane_agents_scenario_subtree(road, features, num_agents, lane_table=None):
+    """
+    Create a malidrive road with agents spread evenly over its lanes.
+    Args:
+        road: the road configuration
+        features: the features of the road mesh
+        num_agents: number of agents
+        lane_table: callable returning the lane table of the road,
+                    None to walk the road geometry
+    Returns:
+        the road behaviour
+    """
+    scenario_subtree = create_malidrive_road(
+        road['file_path'], road['yaml_file_path'], features,
+        road['linear_tolerance'], angular_tolerance=road['angular_tolerance'])
+    return add_lane_agents(
+        scenario_subtree, num_agents, road['agent_type'], lane_table=lane_table)
+
 ##############################################################################
 # Main
 ##############################################################################
@@ -340,6 +460,12 @@ def create_mali_scenario_subtree(file_path, yaml_file_path, features,
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.blackboard.providers
+    import delphyne.trees
+
+    from . import road_cache
+    from .behaviours.roads import RoadCacheProbe
+
     args = parse_arguments()
 
     if os.path.isfile(args.road_name):
@@ -348,51 +474,45 @@ def main():
             'file_path': args.road_name,
             'yaml_file_path': args.yaml_name,
             'linear_tolerance': args.linear_tolerance,
+            'angular_tolerance': 1e-3,
             'agent_type': args.agent_type,
             'lane_position': 0.,
             'moving_forward': True,
         }
     elif args.road_name in KNOWN_ROADS:
-        road = KNOWN_ROADS[args.road_name]
-        if 'file_path' not in road:
-            road['file_path'] = os.path.join(
-                'odr', args.road_name + '.xodr'
-            )
-        if 'yaml_file_path' not in road:
-            road['yaml_file_path'] = os.path.join(
-                'odr', args.yaml_name + '.yaml'
-            )
-        if not os.path.isabs(road['file_path']):
-            road['file_path'] = get_malidrive_resource(road['file_path'])
-        if not os.path.isabs(road['yaml_file_path']):
-            road['yaml_file_path'] = get_malidrive_resource(road['yaml_file_path'])
-        if 'agent_type' not in road:
-            road['agent_type'] = "RailCar"
+        road = get_known_road(args.road_name, args.yaml_name)
     else:
         print("Unknown road {}.".format(args.road_name))
         quit()
 
-    if 'lane_id' in road:
-        lane_id = road['lane_id']
+    road_cache_probe = None
+    if args.road_cache:
+        road_cache_probe = RoadCacheProbe(
+            road_cache.RoadCache(), road['file_path'], road['yaml_file_path'],
+            road['linear_tolerance'], road['angular_tolerance'])
+
+    features = create_road_features(headless=helpers.is_headless(args))
+    if args.num_agents > 0:
+        scenario_subtree = create_lane_agents_scenario_subtree(
+            road, features, args.num_agents,
+            lane_table=road_cache_probe.lane_table if road_cache_probe else None)
     else:
-        lane_provider =                                                                    \
-            delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=1.0)
-        lane_id = lane_provider.random_lane
-
-    features = delphyne_roads.ObjFeatures()
-    features.draw_arrows = True
-    features.draw_elevation_bounds = False
-    features.draw_stripes = True
-    features.draw_lane_haze = False
-    features.draw_branch_points = False
-
-    angular_tolerance = 1e-3 if 'angular_tolerance' not in road else road['angular_tolerance']
-    simulation_tree = delphyne.trees.BehaviourTree(
-        root=create_mali_scenario_subtree(road['file_path'], road['yaml_file_path'], features,
-                                          road['lane_position'], road['agent_type'],
-                                          road['moving_forward'], lane_id,
-                                          road['linear_tolerance'],
-                                          angular_tolerance=angular_tolerance))
+        if 'lane_id' in road:
+            lane_id = road['lane_id']
+        else:
+            lane_provider =                                                                \
+                delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=1.0)
+            lane_id = lane_provider.random_lane
+
+        scenario_subtree = create_mali_scenario_subtree(
+            road['file_path'], road['yaml_file_path'], features,
+            road['lane_position'], road['agent_type'], road['moving_forward'], lane_id,
+            road['linear_tolerance'], angular_tolerance=road['angular_tolerance'])
+
+    if road_cache_probe is not None:
+        scenario_subtree.add_child(road_cache_probe)
+
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
 
     sim_runner_time_step = 0.015
     simulation_tree.setup(
@@ -402,19 +522,10 @@ def main():
         log=args.log,
         time_step=sim_runner_time_step
     )
+    if road_cache_probe is not None:
+        road_cache_probe.print_summary()
 
     tree_time_step = 0.03
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
@@ -39,15 +39,8 @@ The maliput_osm demo.
 
 import os.path
 
-import delphyne.trees
-import delphyne.behaviours
-import delphyne.blackboard.providers
-import delphyne.roads as delphyne_roads
-import delphyne.utilities as utilities
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
+from . import resources
 
 ##############################################################################
 # Supporting Classes & Methods
@@ -181,21 +174,29 @@ found in the current working directory.
     return parser.parse_args()
 
 
-def get_maliput_osm_resource(path):
-    """Resolve the path against maliput_osm resources root location."""
-    root = utilities.get_from_env_or_fail('MALIPUT_OSM_RESOURCE_ROOT')
-    for root in root.split(':'):
-        resolved_path = os.path.join(root, 'resources', 'osm', path)
-        if os.path.exists(resolved_path):
-            return resolved_path
-    return ''
+def create_road_features(headless=False):
+    """
+    Create the features of the maliput_osm road mesh to be rendered.
+    Args:
+        headless: whether the road will be rendered at all, in which case
+                  no decorations are drawn on the road mesh
+    Returns:
+        delphyne.roads.ObjFeatures: the features of the road mesh
+    """
+    return helpers.create_road_features(
+        headless,
+        draw_elevation_bounds=False,
+        draw_lane_haze=False,
+        draw_branch_points=False
+    )
 
 
-def create_mali_scenario_subtree(file_path, origin, yaml_file_path, features,
-                                 lane_position, agent_type, direction_of_travel,
-                                 lane_id, linear_tolerance,
-                                 angular_tolerance=1e-3):
-    scenario_subtree = delphyne.behaviours.roads.MaliputOSM(
+def create_maliput_osm_road(file_path, origin, yaml_file_path, features,
+                            linear_tolerance, angular_tolerance=1e-3):
+    """Create a maliput_osm road behaviour, with no agents on it."""
+    import delphyne.behaviours
+
+    return delphyne.behaviours.roads.MaliputOSM(
         file_path=file_path,
         origin=origin,
         rule_registry_file_path=yaml_file_path,
@@ -209,6 +210,18 @@ def create_mali_scenario_subtree(file_path, origin, yaml_file_path, features,
         angular_tolerance=angular_tolerance,
     )
 
+
+def create_mali_scenario_subtree(file_path, origin, yaml_file_path, features,
+                                 lane_position, agent_type, direction_of_travel,
+                                 lane_id, linear_tolerance,
+                                 angular_tolerance=1e-3):
+    import delphyne.behaviours
+
+    scenario_subtree = create_maliput_osm_road(
+        file_path, origin, yaml_file_path, features,
+        linear_tolerance, angular_tolerance=angular_tolerance
+    )
+
     if agent_type == 'RuleRailCar':
         scenario_subtree.add_child(
             delphyne.behaviours.agents.RuleRailCar(
@@ -234,6 +247,38 @@ def create_mali_scenario_subtree(file_path, origin, yaml_file_path, features,
     return scenario_subtree
 
 
+def get_known_road(road_name, yaml_name=''):
+    """
+    Get the configuration of a well known road, with its file paths
+    resolved against maliput_osm resources root location.
+    Args:
+        road_name: name of the road in KNOWN_ROADS
+        yaml_name: name of the rules file to use when the road has none
+    Returns:
+        dict: a copy of the road configuration
+    """
+    road = dict(KNOWN_ROADS[road_name])
+    if 'file_path' not in road:
+        road['file_path'] = os.path.join(
+            'odr', road_name + '.xodr'
+        )
+    if 'origin' not in road:
+        road['origin'] = '{0, 0, 0}'
+    if 'yaml_file_path' not in road:
+        road['yaml_file_path'] = os.path.join(
+            'odr', yaml_name + '.yaml'
+        )
+    if not os.path.isabs(road['file_path']):
+        road['file_path'] = resources.get_maliput_osm_resource(road['file_path'])
+    if not os.path.isabs(road['yaml_file_path']):
+        road['yaml_file_path'] = resources.get_maliput_osm_resource(road['yaml_file_path'])
+    if 'agent_type' not in road:
+        road['agent_type'] = "RailCar"
+    if 'angular_tolerance' not in road:
+        road['angular_tolerance'] = 1e-3
+    return road
+
+
 def get_road_configuration(args):
     """Return the configuration given the arguments of the application."""
     if os.path.isfile(args.road_name):
@@ -248,23 +293,7 @@ def get_road_configuration(args):
             'moving_forward': True,
         }
     elif args.road_name in KNOWN_ROADS:
-        road = KNOWN_ROADS[args.road_name]
-        if 'file_path' not in road:
-            road['file_path'] = os.path.join(
-                'odr', args.road_name + '.xodr'
-            )
-        if 'origin' not in road:
-            road['origin'] = '{0, 0, 0}'
-        if 'yaml_file_path' not in road:
-            road['yaml_file_path'] = os.path.join(
-                'odr', args.yaml_name + '.yaml'
-            )
-        if not os.path.isabs(road['file_path']):
-            road['file_path'] = get_maliput_osm_resource(road['file_path'])
-        if not os.path.isabs(road['yaml_file_path']):
-            road['yaml_file_path'] = get_maliput_osm_resource(road['yaml_file_path'])
-        if 'agent_type' not in road:
-            road['agent_type'] = "RailCar"
+        road = get_known_road(args.road_name, args.yaml_name)
     else:
         print("Unknown road {}.".format(args.road_name))
         quit()
@@ -277,6 +306,9 @@ def get_road_configuration(args):
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.blackboard.providers
+    import delphyne.trees
+
     args = parse_arguments()
 
     road = get_road_configuration(args)
@@ -288,21 +320,14 @@ def main():
             delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=1.0)
         lane_id = lane_provider.random_lane
 
-    features = delphyne_roads.ObjFeatures()
-    features.draw_arrows = True
-    features.draw_elevation_bounds = False
-    features.draw_stripes = True
-    features.draw_lane_haze = False
-    features.draw_branch_points = False
-
+    features = create_road_features(headless=helpers.is_headless(args))
     angular_tolerance = 1e-3 if 'angular_tolerance' not in road else road['angular_tolerance']
-    simulation_tree = delphyne.trees.BehaviourTree(
-        root=create_mali_scenario_subtree(road['file_path'], road['origin'],
-                                          road['yaml_file_path'], features,
-                                          road['lane_position'], road['agent_type'],
-                                          road['moving_forward'], lane_id,
-                                          road['linear_tolerance'],
-                                          angular_tolerance=angular_tolerance))
+    scenario_subtree = create_mali_scenario_subtree(
+        road['file_path'], road['origin'], road['yaml_file_path'], features,
+        road['lane_position'], road['agent_type'], road['moving_forward'], lane_id,
+        road['linear_tolerance'], angular_tolerance=angular_tolerance)
+
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
     sim_runner_time_step = 0.015
     simulation_tree.setup(
         realtime_rate=args.realtime_rate,
@@ -313,17 +338,6 @@ def main():
     )
 
     tree_time_step = 0.03
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
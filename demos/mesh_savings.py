@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Measures how much road loading time and resident memory is saved by
+skipping the road mesh decorations in headless simulations.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import statistics
+import time
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import mali
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+def measure_road_load(config):
+    """
+    Load a malidrive road, with no agents on it, and measure what it takes.
+    Meant to be run in a process of its own (see benchmarking.isolated_map()).
+    Args:
+        config: a (road name, headless) tuple
+    Returns:
+        dict: road name, headless flag, load time (s) and peak RSS (MiB)
+    """
+    import delphyne.trees
+
+    road_name, headless = config
+    road = mali.get_known_road(road_name)
+    start = time.perf_counter()
+    simulation_tree = delphyne.trees.BehaviourTree(
+        root=mali.create_malidrive_road(
+            road['file_path'], road['yaml_file_path'],
+            mali.create_road_features(headless=headless),
+            road['linear_tolerance'], road['angular_tolerance']
+        )
+    )
+    simulation_tree.setup(
+        realtime_rate=0., start_paused=True, log=False, logfile_name=''
+    )
+    return {
+        'road': road_name,
+        'headless': headless,
+        'load_time': time.perf_counter() - start,
+        'peak_rss': benchmarking.peak_rss(),
+    }
+
+
+def summarize(measurements, road_name, headless):
+    """Median load time and peak RSS of the repeated loads of a road."""
+    selected = [
+        measurement for measurement in measurements
+        if measurement['road'] == road_name and measurement['headless'] == headless
+    ]
+    return (statistics.median(measurement['load_time'] for measurement in selected),
+            statistics.median(measurement['peak_rss'] for measurement in selected))
+
+
+def saving(full, headless):
+    """Relative saving, in percent."""
+    return 100. * (full - headless) / full if full > 0. else 0.
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    town_roads = [name for name in mali.KNOWN_ROADS if name.startswith('Town')]
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Mesh Savings",
+            """
+Loads malidrive roads with full and with headless road features, each
+load in a freshly spawned process, and reports how much loading time
+and peak resident memory the headless features save.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "roads", nargs="*", metavar="road", default=town_roads,
+        help="Roads to be loaded, out of mali's known roads (default: {}).".format(
+            ", ".join(town_roads))
+    )
+    parser.add_argument(
+        "-r", "--repeats", default=3, type=int,
+        help="Number of loads per road and features, medians are reported (default: 3)."
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help=("Number of loads to run in parallel. Zero uses all available "
+              "cores. Parallel loads skew load times (default: 1)")
+    )
+    args = parser.parse_args()
+    for name in args.roads:
+        if name not in mali.KNOWN_ROADS:
+            parser.error("unknown road {}".format(name))
+    return args
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    configs = [
+        (road_name, headless)
+        for road_name in args.roads
+        for headless in (False, True)
+        for _ in range(args.repeats)
+    ]
+    measurements = list(benchmarking.isolated_map(
+        measure_road_load, configs, args.jobs
+    ))
+
+    print("{:<24} {:>10} {:>10} {:>8} {:>10} {:>10} {:>8}".format(
+        'road', 'full (s)', 'bare (s)', 'saved', 'full MiB', 'bare MiB', 'saved'))
+    for road_name in args.roads:
+        full_time, full_rss = summarize(measurements, road_name, False)
+        bare_time, bare_rss = summarize(measurements, road_name, True)
+        print("{:<24} {:>10.3f} {:>10.3f} {:>7.1f}% {:>10.1f} {:>10.1f} {:>7.1f}%".format(
+            road_name, full_time, bare_time, saving(full_time, bare_time),
+            full_rss, bare_rss, saving(full_rss, bare_rss)))
@@ -36,22 +36,22 @@ The performance benchmark demo.
 # Imports
 ##############################################################################
 
-import math
-
-import delphyne.behaviours
-import delphyne.blackboard
-import delphyne.trees
-import delphyne_gui.utilities
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
+from . import mali
+from . import recording
+from . import resources
+from . import road_cache
+from . import spawning
 
 ##############################################################################
 # Supporting Classes & Methods
 ##############################################################################
 
 
+# Minimum distance between any two agents at spawn time.
+SPAWN_SPACING = 6.  # m
+
+
 def benchmark(setup_fn):
     """
     Helper decorator to register benchmark simulation
@@ -63,49 +63,59 @@ def benchmark(setup_fn):
     return setup_fn
 
 
-@benchmark
-def curved_lanes(args):
+def layout(version):
     """
-    Sets up a simulation with `args.num_cars` MOBIL cars on a few
-    lanes of a curved (arc) road.
+    Helper decorator to version the agent layout of a benchmark, to be
+    bumped whenever the benchmark places its agents differently so that
+    its records are not compared against baselines of another layout.
     """
+    def decorate(setup_fn):
+        setup_fn.layout = version
+        return setup_fn
+    return decorate
 
-    # Loads Multilane road.
-    scenario_subtree = delphyne.behaviours.roads.Multilane(
-        file_path=delphyne_gui.utilities.get_delphyne_gui_resource(
-            'roads/curved_lanes.yaml'
-        )
+
+def add_benchmark_agents(scenario_subtree, args, lane_table=None):
+    """
+    Add `args.num_cars` MOBIL cars and `args.traffic_density` rail cars
+    per MOBIL car at random over the whole lane network of a road, with
+    no two of them closer than SPAWN_SPACING. Overlapping agents would
+    start the benchmark with a storm of collisions, so a density that
+    does not fit the road fails the setup with a `spawning.SpawnError`.
+    Args:
+        scenario_subtree: the road behaviour to add the agents to
+        args: parsed command line arguments
+        lane_table: callable returning the lane table of the road,
+                    None to walk the road geometry
+    Returns:
+        the scenario subtree
+    """
+    import delphyne.behaviours
+
+    num_traffic = int(args.traffic_density * args.num_cars)
+    allocator = spawning.SpawnAllocator(
+        args.num_cars + num_traffic, SPAWN_SPACING, seed=1, lane_table=lane_table
     )
 
-    # Adds the N MOBIL cars to the multilane.
-    R0 = 320.  # m
+    # Adds the N MOBIL cars.
     for i in range(args.num_cars):
-        R = R0 - 4. * (i % 3)  # m
-        # For a 6m distance between cars.
-        theta = (12. / R0) * (i / 3)  # rads
         scenario_subtree.add_child(
             delphyne.behaviours.agents.MobilCar(
                 name="mobil" + str(i),
-                initial_pose=(
-                    R * math.sin(theta),  # m
-                    R0 - R * math.cos(theta),  # m
-                    theta  # rads
-                ),
+                initial_pose=allocator.initial_pose(i),
                 speed=1.,  # m/s
             )
         )
 
-    # Adds the N*T rail cars to the multilane.
-    num_traffic = int(args.traffic_density * args.num_cars)
-    lane_provider = delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=6.)
+    # Adds the N*T rail cars.
     for i in range(num_traffic):
         scenario_subtree.add_child(
             delphyne.behaviours.agents.RailCar(
                 name="rail " + str(i),
-                lane_id=lane_provider.random_lane,
-                longitudinal_position=12. * (i / 3) + 6.,  # m
+                lane_id=allocator.lane_id(args.num_cars + i),
+                longitudinal_position=allocator.longitudinal_position(args.num_cars + i),
                 lateral_offset=0.,  # m
-                speed=1.  # m/s
+                speed=1.   # m/s
             )
         )
 
@@ -113,56 +123,51 @@ def curved_lanes(args):
 
 
 @benchmark
-def straight_lanes(args):
+@layout(2)
+def curved_lanes(args):
     """
     Sets up a simulation with `args.num_cars` MOBIL cars on a few
-    lanes of a straight road.
+    lanes of a curved (arc) road.
     """
+    import delphyne.behaviours
 
     # Loads Multilane road.
     scenario_subtree = delphyne.behaviours.roads.Multilane(
-        file_path=delphyne_gui.utilities.get_delphyne_gui_resource(
-            'roads/straight_lanes.yaml'
+        file_path=resources.get_delphyne_gui_resource(
+            'roads/curved_lanes.yaml'
         )
     )
 
-    # Adds the N MOBIL cars to the multilane.
-    for i in range(args.num_cars):
-        scenario_subtree.add_child(
-            delphyne.behaviours.agents.MobilCar(
-                name="mobil" + str(i),
-                initial_pose=(
-                    12. * (i / 3),  # m
-                    4. * (i % 3),  # m
-                    0.  # rads
-                ),
-                speed=1.,  # m/s
-            )
-        )
+    return add_benchmark_agents(scenario_subtree, args)
 
-    # Adds the N*T rail cars to the multilane.
-    num_traffic = int(args.traffic_density * args.num_cars)
-    lane_provider = delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=6.)
-    for i in range(num_traffic):
-        scenario_subtree.add_child(
-            delphyne.behaviours.agents.RailCar(
-                name="rail " + str(i),
-                lane_id=lane_provider.random_lane,
-                longitudinal_position=12. * (i / 3) + 6.,  # m
-                lateral_offset=0.,  # m
-                speed=1.   # m/s
-            )
+
+@benchmark
+@layout(2)
+def straight_lanes(args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars on a few
+    lanes of a straight road.
+    """
+    import delphyne.behaviours
+
+    # Loads Multilane road.
+    scenario_subtree = delphyne.behaviours.roads.Multilane(
+        file_path=resources.get_delphyne_gui_resource(
+            'roads/straight_lanes.yaml'
         )
+    )
 
-    return scenario_subtree
+    return add_benchmark_agents(scenario_subtree, args)
 
 
 @benchmark
+@layout(2)
 def dragway(args):
     """
     Sets up a simulation with `args.num_cars` MOBIL cars on a dragway
     road with four (4) lanes.
     """
+    import delphyne.behaviours
 
     scenario_subtree = delphyne.behaviours.roads.Dragway(
         name="dragway",
@@ -173,35 +178,75 @@ def dragway(args):
         maximum_height=5.0  # m
     )
 
-    # Adds the N MOBIL cars to the dragway.
-    for i in range(args.num_cars):
-        scenario_subtree.add_child(
-            delphyne.behaviours.agents.MobilCar(
-                name="mobil" + str(i),
-                initial_pose=(
-                     12. * (i / 4),  # m
-                    -5.5 + 3.7 * (i % 4),  # m
-                     0.  # rads
-                ),
-                speed=1.,  # m/s
-            )
-        )
+    return add_benchmark_agents(scenario_subtree, args)
 
-    # Adds the N*T rail cars to the multilane.
-    num_traffic = int(args.traffic_density * args.num_cars)
-    lane_provider = delphyne.blackboard.providers.LaneLocationProvider(distance_between_agents=6.)
-    for i in range(num_traffic):
-        scenario_subtree.add_child(
-            delphyne.behaviours.agents.RailCar(
-                name="rail " + str(i),
-                lane_id=lane_provider.random_lane,
-                longitudinal_position=12. * (i / 4) + 6.,  # m
-                lateral_offset=0.,  # m
-                speed=1.   # m/s
-            )
-        )
 
-    return scenario_subtree
+def malidrive_benchmark(road_name, args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars and
+    `args.traffic_density` rail cars per MOBIL car spread across
+    the whole lane network of a well known malidrive road. With
+    `args.road_cache`, the lane table agents are spread with comes
+    from the road cache.
+    """
+    road = mali.get_known_road(road_name)
+    scenario_subtree = mali.create_malidrive_road(
+        road['file_path'], road['yaml_file_path'],
+        mali.create_road_features(headless=helpers.is_headless(args)),
+        road['linear_tolerance'], angular_tolerance=road['angular_tolerance']
+    )
+
+    lane_table = None
+    if args.road_cache:
+        from .behaviours.roads import RoadCacheProbe
+
+        road_cache_probe = RoadCacheProbe(
+            road_cache.RoadCache(), road['file_path'], road['yaml_file_path'],
+            road['linear_tolerance'], road['angular_tolerance'])
+        scenario_subtree.add_child(road_cache_probe)
+        lane_table = road_cache_probe.lane_table
+
+    return add_benchmark_agents(scenario_subtree, args, lane_table=lane_table)
+
+
+@benchmark
+@layout(2)
+def town03(args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars on the
+    Town03 malidrive map.
+    """
+    return malidrive_benchmark('Town03', args)
+
+
+@benchmark
+@layout(2)
+def town04(args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars on the
+    Town04 malidrive map.
+    """
+    return malidrive_benchmark('Town04', args)
+
+
+@benchmark
+@layout(2)
+def highway(args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars on the
+    Highway malidrive map.
+    """
+    return malidrive_benchmark('Highway', args)
+
+
+@benchmark
+@layout(2)
+def rr_long_road(args):
+    """
+    Sets up a simulation with `args.num_cars` MOBIL cars on the
+    RRLongRoad malidrive map.
+    """
+    return malidrive_benchmark('RRLongRoad', args)
 
 
 def parse_arguments():
@@ -224,7 +269,34 @@ def parse_arguments():
         "-n", "--num-cars", default=20, type=int,
         help="The number of MOBIL cars on scene (default: 20)."
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--road-cache", action="store_true", default=False,
+        help=("Look the lane table of malidrive roads up in, and store it to, "
+              "the road cache, to spread agents with.")
+    )
+    parser.add_argument(
+        "--record", default=None, metavar="DIRECTORY",
+        help="Directory to record agent states to (default: none)."
+    )
+    parser.add_argument(
+        "--record-rate", default=10., type=float,
+        help="Agent state samples per second of simulation time (default: 10)."
+    )
+    parser.add_argument(
+        "--record-lanes", action="store_true", default=False,
+        help=("Record the lane each agent is on too, at the cost of a road "
+              "geometry query per agent and sample (default: off).")
+    )
+    parser.add_argument(
+        "--record-compression", default=None,
+        choices=("auto",) + tuple(recording.CODECS.keys()),
+        help=("Compress agent state recordings with the given codec, auto picks "
+              "the best available one (default: no compression).")
+    )
+    args = parser.parse_args()
+    if args.record_lanes and not args.record:
+        parser.error("--record-lanes requires --record")
+    return args
 
 
 ##############################################################################
@@ -234,11 +306,20 @@ def parse_arguments():
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+    import delphyne_gui.utilities
+
     args = parse_arguments()
 
-    simulation_tree = delphyne.trees.BehaviourTree(
-        root=benchmark.register[args.benchmark](args)
-    )
+    scenario_subtree = benchmark.register[args.benchmark](args)
+    recorder = None
+    if args.record:
+        recorder = recording.record_agents(
+            scenario_subtree, args.record, args.record_rate,
+            record_lanes=args.record_lanes,
+            compression=args.record_compression
+        )
+    simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
 
     simulation_tree.setup(
         realtime_rate=args.realtime_rate,
@@ -247,24 +328,18 @@ def main():
         logfile_name=args.logfile_name
     )
 
-    tree_time_step = 0.02
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite amount of time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
+    def finish(simulation_tree):
         # stop simulation if it's necessary
         if simulation_tree.runner.is_interactive_loop_running():
             simulation_tree.runner.stop()
         # print simulation stats
         print("Simulation ended. I'm happy, you should be too.")
         delphyne_gui.utilities.print_simulation_stats(simulation_tree.runner)
-        launcher.terminate()
+
+    tree_time_step = 0.02
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, on_finish=finish, ign_visualizer="visualizer"
+    )
+    if recorder is not None:
+        recorder.close()
+        recorder.print_stats()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Capacity search over the performance benchmarks: finds the largest
+number of agents that still holds a target realtime rate.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import functools
+import json
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import spawning
+from .mobil_perf import benchmark
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+def find_capacity(holds, low, high):
+    """
+    Find the largest integer in the [low, high] range for which a
+    monotonically non-increasing predicate holds, doubling from `low`
+    to bracket it and then bisecting.
+    Args:
+        holds: predicate taking an integer
+        low: lowest value to try
+        high: highest value to try
+    Returns:
+        the largest value for which the predicate holds, or `low - 1`
+        if it holds for none
+    """
+    if not holds(low):
+        return low - 1
+    good, bad = low, None
+    while bad is None:
+        candidate = min(good * 2, high)
+        if candidate == good:
+            return good
+        if holds(candidate):
+            good = candidate
+        else:
+            bad = candidate
+    while bad - good > 1:
+        candidate = (good + bad) // 2
+        if holds(candidate):
+            good = candidate
+        else:
+            bad = candidate
+    return good
+
+
+def search_capacity(name, options):
+    """
+    Search the capacity of a benchmark, i.e. the largest number of MOBIL
+    cars (or, optionally, of rail cars per MOBIL car) for which the steady
+    state realtime rate stays at or above the target. The search may also
+    be cut short by the road, when no more agents fit on it.
+    Args:
+        name: name of the benchmark in the `benchmark.register`
+        options: parsed command line arguments
+    Returns:
+        dict: the capacity found along with the record of the run at capacity
+    """
+    records = {}
+    overcrowded = set()
+
+    def run(value):
+        if options.search == 'num-cars':
+            num_cars, traffic_density = value, options.traffic_density
+        else:
+            num_cars, traffic_density = options.num_cars, value * options.density_step
+        try:
+            record = benchmarking.run_benchmark(
+                name, num_cars, traffic_density, options.warmup + options.window,
+                warmup=options.warmup
+            )
+        except spawning.SpawnError as e:
+            # Agents no longer fit the road, whatever the realtime rate.
+            print("{}: {}".format(name, e))
+            overcrowded.add(value)
+            return False
+        print("{benchmark}: {num_cars} MOBIL cars, traffic density {traffic_density} "
+              "run at {steady_state_realtime_rate:.2f}x realtime".format(**record))
+        records[value] = record
+        return record['steady_state_realtime_rate'] >= options.target_realtime_rate
+
+    capacity = find_capacity(run, 1, options.max)
+    record = records.get(capacity, {})
+    if capacity + 1 in overcrowded:
+        limit = 'road'
+    elif capacity < options.max:
+        limit = 'realtime'
+    else:
+        limit = 'max'
+    return {
+        'benchmark': name,
+        'backend': record.get('backend', ''),
+        'search': options.search,
+        'target_realtime_rate': options.target_realtime_rate,
+        'num_cars': record.get('num_cars', 0),
+        'traffic_density': record.get('traffic_density', 0.),
+        'num_agents': record.get('num_agents', 0),
+        'steady_state_realtime_rate': record.get('steady_state_realtime_rate', 0.),
+        # What the capacity is bound by: the realtime rate, the road or the search.
+        'limit': limit,
+        'runs': len(records),
+    }
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "MOBIL Performance Capacity",
+            """
+Searches, for each MOBIL performance benchmark, the largest number of
+MOBIL cars (or of rail cars per MOBIL car) that still holds a target
+realtime rate over a steady state window. Simulations run headless and
+as fast as possible, and the achieved realtime rate is compared against
+the target. Capacities bound by the road, i.e. by how many agents fit on
+it, rather than by the realtime rate, are reported as such.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="benchmark",
+        help="Benchmarks to be searched, out of {} (default: all of them).".format(
+            ", ".join(benchmark.register.keys()))
+    )
+    parser.add_argument(
+        "-R", "--target-realtime-rate", default=1.0, type=float,
+        help="Realtime rate to hold (default: 1.0)."
+    )
+    parser.add_argument(
+        "-s", "--search", default="num-cars", choices=["num-cars", "traffic-density"],
+        help=("Whether to search the number of MOBIL cars or the traffic "
+              "density (default: num-cars).")
+    )
+    parser.add_argument(
+        "-n", "--num-cars", default=20, type=int,
+        help="The number of MOBIL cars when searching the traffic density (default: 20)."
+    )
+    parser.add_argument(
+        "-t", "--traffic-density", default=0, type=float,
+        help="The traffic density when searching the number of MOBIL cars (default: 0)."
+    )
+    parser.add_argument(
+        "--density-step", default=0.5, type=float,
+        help="Resolution of the traffic density search (default: 0.5)."
+    )
+    parser.add_argument(
+        "--max", default=4096, type=int,
+        help=("Upper bound of the search, in MOBIL cars or in density steps "
+              "(default: 4096).")
+    )
+    parser.add_argument(
+        "-w", "--warmup", default=2.0, type=float,
+        help="Simulation time left out of the measurement (sec) (default: 2s)."
+    )
+    parser.add_argument(
+        "-W", "--window", default=10.0, type=float,
+        help="Steady state simulation time measured (sec) (default: 10s)."
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help=("Number of benchmarks to search in parallel, each in a worker "
+              "process pinned to its own core. Zero uses all available "
+              "cores (default: 1)")
+    )
+    parser.add_argument(
+        "-o", "--output", default="",
+        help="File to write results to, as JSON (default: none)"
+    )
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in benchmark.register:
+            parser.error("unknown benchmark {}".format(name))
+    return args
+
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    benchmarks = args.benchmarks or list(benchmark.register.keys())
+    results = list(benchmarking.parallel_map(
+        functools.partial(search_capacity, options=args), benchmarks, args.jobs
+    ))
+    results.sort(key=lambda result: result['benchmark'])
+
+    print("Capacity at {}x realtime:".format(args.target_realtime_rate))
+    print("{:<20} {:<12} {:>8} {:>8} {:>8} {:>10} {:>10}".format(
+        'benchmark', 'backend', 'cars', 'traffic', 'agents', 'rt rate', 'limit'))
+    for result in results:
+        print("{benchmark:<20} {backend:<12} {num_cars:>8} {traffic_density:>8.2f} "
+              "{num_agents:>8} {steady_state_realtime_rate:>10.2f} {limit:>10}".format(
+                  **result))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        print("Results written to {}.".format(args.output))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Headless sweep over the performance benchmarks.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import decimal
+import itertools
+import sys
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from .mobil_perf import benchmark
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+def sweep_values(value_type):
+    """
+    Build an argparse type that parses either a comma separated list of
+    values (e.g. `10,20,40`) or an inclusive `start:stop:step` range
+    (e.g. `10:100:10`).
+    Args:
+        value_type: type of the values, e.g. int or float
+    Returns:
+        a callable that parses a sweep argument into a list of values
+    """
+
+    def parse(text):
+        try:
+            if ':' not in text:
+                return [value_type(value) for value in text.split(',')]
+            bounds = text.split(':')
+            start, stop, step = (value_type(value) for value in bounds)
+            # Decimal places written in the range, to round values off to.
+            digits = max(-decimal.Decimal(value).as_tuple().exponent for value in bounds)
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            raise argparse.ArgumentTypeError(
+                "{} is neither a list nor a start:stop:step range".format(text))
+        if step <= 0 or stop < start:
+            raise argparse.ArgumentTypeError(
+                "{} is not a valid start:stop:step range".format(text))
+        # Tolerate floating point round-off on the upper bound.
+        count = int((stop - start) / step + 1e-9) + 1
+        return [value_type(round(start + k * step, max(digits, 0))) for k in range(count)]
+    return parse
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "MOBIL Performance Sweep",
+            """
+Runs the MOBIL performance benchmarks headless for every combination
+of MOBIL car count and traffic density, and writes one record per run
+with wall time, achieved realtime rate, ticks per second and tick
+latency percentiles (ms).
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "benchmarks", nargs="*", metavar="benchmark",
+        help="Benchmarks to be run, out of {} (default: all of them).".format(
+            ", ".join(benchmark.register.keys()))
+    )
+    parser.add_argument(
+        "-n", "--num-cars", default=[20], type=sweep_values(int),
+        help=("MOBIL car counts, either as a comma separated list or as "
+              "an inclusive start:stop:step range (default: 20).")
+    )
+    parser.add_argument(
+        "-t", "--traffic-density", default=[0.], type=sweep_values(float),
+        help=("Rail cars per MOBIL car, either as a comma separated list or "
+              "as an inclusive start:stop:step range (default: 0).")
+    )
+    parser.add_argument(
+        "-d", "--duration", default=5.0, type=float,
+        help="Simulation length of each run (sec) (default: 5s)"
+    )
+    parser.add_argument(
+        "-r", "--realtime_rate", default=0., type=float,
+        help=("Ratio of sim vs real time, zero runs as fast "
+              "as possible (default: 0.0)")
+    )
+    parser.add_argument(
+        "-o", "--output", default="mobil_perf_sweep.jsonl",
+        help=("File to write results to, as CSV if it has a .csv "
+              "extension or as JSON lines otherwise "
+              "(default: mobil_perf_sweep.jsonl)")
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help=("Number of benchmarks to run in parallel, each in a worker "
+              "process pinned to its own core. Zero uses all available "
+              "cores (default: 1)")
+    )
+    parser.add_argument(
+        "--save-baseline", default="", metavar="PATH",
+        help="Save the results as a baseline to PATH."
+    )
+    parser.add_argument(
+        "--compare-baseline", default="", metavar="PATH",
+        help=("Compare the results against the baseline at PATH, exiting "
+              "with a non-zero code if any benchmark regressed.")
+    )
+    parser.add_argument(
+        "--tolerance", default=0.1, type=float,
+        help=("Allowed relative drop in ticks per second, or growth in p99 "
+              "tick latency, before a benchmark is considered to have "
+              "regressed (default: 0.1)")
+    )
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in benchmark.register:
+            parser.error("unknown benchmark {}".format(name))
+    return args
+
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    benchmarks = args.benchmarks or list(benchmark.register.keys())
+    runs = list(itertools.product(
+        benchmarks, args.num_cars, args.traffic_density
+    ))
+    # Fail early rather than after the whole sweep has run.
+    baseline = None
+    if args.compare_baseline:
+        baseline = benchmarking.load_baseline(args.compare_baseline)
+
+    records = []
+    with benchmarking.RecordWriter(args.output) as writer:
+        print("Running {} benchmarks.".format(len(runs)))
+        for record in benchmarking.run_benchmarks(
+                runs, args.duration, jobs=args.jobs, realtime_rate=args.realtime_rate):
+            writer.write(record)
+            records.append(record)
+            print("[{}/{}] {benchmark} with {num_cars} MOBIL cars and traffic density "
+                  "{traffic_density}: {ticks_per_second:.1f} ticks/s, realtime rate "
+                  "{realtime_rate:.2f}, p99 tick latency {tick_latency_p99:.2f}ms"
+                  .format(len(records), len(runs), **record))
+    benchmarking.print_report(records)
+    print("Results written to {}.".format(args.output))
+
+    if args.save_baseline:
+        benchmarking.save_baseline(records, args.save_baseline)
+        print("Baseline saved to {}.".format(args.save_baseline))
+
+    if baseline is not None:
+        regressions = benchmarking.compare_to_baseline(
+            records, baseline, args.tolerance
+        )
+        if regressions:
+            print("Performance regressions detected:")
+            for regression in regressions:
+                print("--> " + regression)
+            sys.exit(1)
+        print("No performance regressions against {}.".format(args.compare_baseline))
@@ -39,11 +39,6 @@ Manipulating the rate of time at startup and in runtime.
 import os
 import sys
 
-import delphyne.trees
-import delphyne.behaviours
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
 
 ##############################################################################
@@ -98,6 +93,8 @@ to `1.6` to depict how dynamic real-time rate impacts on the simulation.
 
 
 def create_realtime_scenario_subtree():
+    import delphyne.behaviours
+
     scenario_subtree = delphyne.behaviours.roads.Road()
     scenario_subtree.add_child(
         delphyne.behaviours.agents.SimpleCar(name=str(0), speed=0.0))
@@ -110,6 +107,8 @@ def create_realtime_scenario_subtree():
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     # Read the initial real-time rate from command line. Default to 1.0 if none
     # specified.
     args = parse_arguments()
@@ -136,17 +135,6 @@ def main():
           .format(simulation_tree.runner.get_realtime_rate(), initial_steps))
 
     tree_time_step = 0.02
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Columnar recordings of agent states.
+
+A recording is a directory with one raw binary file per column and a
+`manifest.json` describing them. Every column holds one row per sample,
+and every row holds the value of that column for each agent, in the
+order agents are listed in the manifest:
+
+    time.bin      float64, one value per sample (s)
+    position.bin  float64, x, y and z per agent (m)
+    rotation.bin  float64, w, x, y and z of a quaternion per agent
+    velocity.bin  float64, angular (rad/s) then linear (m/s) per agent
+    lane.bin      int32, index into the manifest lanes per agent, -1
+                  when off road (only if recording lanes)
+
+Samples are appended in chunks, and the manifest is rewritten after
+every chunk, so a recording is readable while it grows. Recordings are
+read back with AgentStateLog.
+
+Recordings may also be compressed chunk by chunk, with zstd, lz4 or
+zlib. Column files then hold one compressed frame per chunk, and the
+manifest lists the offset and size of every frame.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import bisect
+import collections
+import itertools
+import json
+import os
+import zlib
+
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+MANIFEST = 'manifest.json'
+
+# Distance to the closest lane beyond which agents are off road (m).
+OFF_ROAD_DISTANCE = 1e-3
+
+# Name, dtype and per agent shape of the columns of agent states.
+AGENT_COLUMNS = (
+    ('position', '<f8', (3,)),
+    ('rotation', '<f8', (4,)),
+    ('velocity', '<f8', (6,)),
+)
+
+Codec = collections.namedtuple('Codec', ['name', 'compress', 'decompress'])
+
+
+def _zstd_codec():
+    import zstandard
+
+    return Codec('zstd', zstandard.ZstdCompressor(level=3).compress,
+                 zstandard.ZstdDecompressor().decompress)
+
+
+def _lz4_codec():
+    import lz4.frame
+
+    return Codec('lz4', lz4.frame.compress, lz4.frame.decompress)
+
+
+def _zlib_codec():
+    return Codec('zlib', lambda data: zlib.compress(data, 1), zlib.decompress)
+
+
+# Codecs, from the most to the least preferred.
+CODECS = collections.OrderedDict((
+    ('zstd', _zstd_codec),
+    ('lz4', _lz4_codec),
+    ('zlib', _zlib_codec),
+))
+
+
+def get_codec(name='auto'):
+    """
+    Get a compression codec. zstd and lz4 need the zstandard and
+    lz4 packages, zlib is always available.
+    Args:
+        name: codec name, or 'auto' for the most preferred available
+    Returns:
+        Codec: the codec name and its compress and decompress callables
+    """
+    if name != 'auto':
+        return CODECS[name]()
+    for make_codec in CODECS.values():
+        try:
+            return make_codec()
+        except ImportError:
+            pass
+
+
+def record_agents(scenario_subtree, path, rate=10., **kwargs):
+    """
+    Record all agents of a scenario, i.e. all the children of its
+    subtree, by adding a recorder to it.
+    Args:
+        scenario_subtree: the road behaviour the agents were added to
+        path: directory to record to
+        rate: samples per second of simulation time
+        kwargs: additional keyword arguments for
+                behaviours.recorders.AgentStateRecorder
+    Returns:
+        the recorder, to close once the simulation is over
+    """
+    from .behaviours.recorders import AgentStateRecorder
+
+    recorder = AgentStateRecorder(
+        path, [agent.name for agent in scenario_subtree.children], rate, **kwargs
+    )
+    scenario_subtree.add_child(recorder)
+    return recorder
+
+
+class AgentStateLog(object):
+    """
+    Reads a recording by memory mapping its columns, so that only the
+    pages actually looked at are ever loaded. All queries return views
+    of the mapped files rather than copies. Compressed recordings cannot
+    be mapped: queries on them decompress the chunks they overlap, and
+    return copies.
+
+    Samples are looked up by time with a binary search over the time
+    column, which only loads the handful of pages it looks at. Sample
+    times need not be evenly spaced, e.g. when ticks were slower than the
+    sampling rate.
+
+    Args:
+        path: recording directory
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        with open(os.path.join(path, MANIFEST)) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.rate = self.manifest['rate']
+        self.num_samples = self.manifest['num_samples']
+        self.agent_names = self.manifest['agents']
+        self.lanes = self.manifest['lanes']
+        self._agent_indices = {name: k for k, name in enumerate(self.agent_names)}
+        self.path = path
+        self.columns = {}
+        self.compression = self.manifest.get('compression')
+        if self.compression is not None:
+            self._codec = get_codec(self.compression)
+            self._chunks = self.manifest['chunks']
+            self._chunk_starts = list(itertools.accumulate(
+                [0] + [chunk['num_samples'] for chunk in self._chunks[:-1]]
+            ))
+            self.time = self._read_compressed('time', 0, self.num_samples)
+            return
+        for name, column in self.manifest['columns'].items():
+            shape = (self.num_samples,) + tuple(column['shape'])
+            if not self.num_samples:
+                # Empty files cannot be mapped.
+                self.columns[name] = np.empty(shape, dtype=column['dtype'])
+                continue
+            # The recorder may still be appending past the manifest count.
+            self.columns[name] = np.memmap(
+                os.path.join(path, column['file']), dtype=column['dtype'],
+                mode='r', shape=shape
+            )
+        self.time = self.columns['time']
+
+    def __len__(self):
+        return self.num_samples
+
+    def agent_index(self, agent_name):
+        """Index of an agent in the per agent columns."""
+        return self._agent_indices[agent_name]
+
+    def index_at(self, time):
+        """
+        Find the first sample taken at or after a given time.
+        Args:
+            time: simulation time (s)
+        Returns:
+            int: sample index, the number of samples if there are none
+        """
+        import numpy as np
+
+        return int(np.searchsorted(self.time, time, side='left'))
+
+    def _read_compressed(self, name, start, stop):
+        import numpy as np
+
+        column = self.manifest['columns'][name]
+        dtype, shape = np.dtype(column['dtype']), tuple(column['shape'])
+        if start >= stop:
+            return np.empty((0,) + shape, dtype=dtype)
+        first = bisect.bisect_right(self._chunk_starts, start) - 1
+        parts = []
+        with open(os.path.join(self.path, column['file']), 'rb') as column_file:
+            for chunk, chunk_start in zip(self._chunks[first:], self._chunk_starts[first:]):
+                if chunk_start >= stop:
+                    break
+                offset, size = chunk[name]
+                column_file.seek(offset)
+                data = self._codec.decompress(column_file.read(size))
+                parts.append(np.frombuffer(data, dtype=dtype).reshape((-1,) + shape))
+        offset = self._chunk_starts[first]
+        return np.concatenate(parts)[start - offset:stop - offset]
+
+    def _window_slice(self, start_time, end_time):
+        return slice(
+            None if start_time is None else self.index_at(start_time),
+            None if end_time is None else self.index_at(end_time)
+        )
+
+    def _read(self, name, window):
+        if self.compression is None:
+            return self.columns[name][window]
+        start, stop, _ = window.indices(self.num_samples)
+        return self._read_compressed(name, start, stop)
+
+    def window(self, start_time=None, end_time=None):
+        """
+        Get the samples taken over a time window, of all agents.
+        Args:
+            start_time: start of the window (s), the first sample if None
+            end_time: end of the window (s), excluded, the last sample if None
+        Returns:
+            dict: views of every column over the window, by column name,
+                  copies if the recording is compressed
+        """
+        window = self._window_slice(start_time, end_time)
+        return {name: self._read(name, window) for name in self.manifest['columns']}
+
+    def column(self, name, agent_name=None, start_time=None, end_time=None):
+        """
+        Get a column over a time window, of one or all agents.
+        Args:
+            name: column name, e.g. position
+            agent_name: name of the agent, all agents if None
+            start_time: start of the window (s), the first sample if None
+            end_time: end of the window (s), excluded, the last sample if None
+        Returns:
+            a view of the column, a copy if the recording is compressed
+        """
+        view = self._read(name, self._window_slice(start_time, end_time))
+        if agent_name is None or name == 'time':
+            return view
+        return view[:, self.agent_index(agent_name)]
+
+    def lane_ids(self, lane_indices):
+        """Map recorded lane indices to lane ids, None when off road."""
+        return [self.lanes[index] if index >= 0 else None for index in lane_indices]
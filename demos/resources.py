@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Resolution of resource files against the resource roots.
+
+Resource roots are given as colon separated lists in environment
+variables, and a relative resource path resolves against the first root
+that has it. Rather than probing every root on every lookup, the
+directories lookups fall in are listed once per root, on first use,
+so that later lookups in them are answered from memory.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import os
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+class ResourceIndex(object):
+    """
+    An index of the files under an ordered list of resource roots,
+    filled in one directory at a time as lookups need it.
+
+    Args:
+        roots: resource root directories, in order of precedence
+        prefix: subdirectory of each root the resources live in
+    """
+    def __init__(self, roots, prefix=''):
+        self._bases = [os.path.join(root, prefix) for root in roots if root]
+        self._listings = {}
+
+    def __len__(self):
+        return sum(len(names) for names in self._listings.values())
+
+    def _listing(self, directory):
+        if directory not in self._listings:
+            try:
+                self._listings[directory] = frozenset(os.listdir(directory))
+            except OSError:
+                self._listings[directory] = frozenset()
+        return self._listings[directory]
+
+    def resolve(self, path):
+        """
+        Resolve a resource path.
+
+        Args:
+            path: resource path, relative to the roots
+        Returns:
+            str: the resolved path, empty if no root has the resource
+        """
+        dirname, basename = os.path.split(os.path.normpath(path))
+        for base in self._bases:
+            # Earlier roots take precedence.
+            if basename in self._listing(os.path.join(base, dirname)):
+                return os.path.join(base, path)
+        return ''
+
+
+_INDEXES = {}
+
+
+def get_resource_index(variable, prefix=''):
+    """
+    Get the index of the resource roots listed in an environment variable,
+    creating it on first use.
+
+    Args:
+        variable: name of the environment variable listing the roots
+        prefix: subdirectory of each root the resources live in
+    Returns:
+        ResourceIndex: the index of the roots
+    """
+    import delphyne.utilities as utilities
+
+    key = (variable, prefix)
+    if key not in _INDEXES:
+        roots = utilities.get_from_env_or_fail(variable).split(':')
+        _INDEXES[key] = ResourceIndex(roots, prefix)
+    return _INDEXES[key]
+
+
+def get_malidrive_resource(path):
+    """Resolve the path against malidrive resources root location."""
+    return get_resource_index(
+        'MALIPUT_MALIDRIVE_RESOURCE_ROOT', 'resources'
+    ).resolve(path)
+
+
+def get_maliput_osm_resource(path):
+    """Resolve the path against maliput_osm resources root location."""
+    return get_resource_index(
+        'MALIPUT_OSM_RESOURCE_ROOT', os.path.join('resources', 'osm')
+    ).resolve(path)
+
+
+def get_delphyne_gui_resource(path):
+    """Resolve the path against delphyne_gui resources root location."""
+    return get_resource_index('DELPHYNE_GUI_RESOURCE_ROOT').resolve(path)
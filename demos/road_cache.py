@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+A persistent, content-addressed cache of road network descriptions.
+
+Entries are keyed on the hashes of the road and rules files plus the
+tolerances the road is built with, so that editing any of them, or
+loading the same road with different tolerances, never hits a stale
+entry. Each entry holds the lane table of the loaded road network, i.e.
+the id and length of every lane, which is expensive to walk through the
+maliput bindings on large maps.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+import delphyne.cmdline as cmdline
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+def get_default_cache_dir():
+    """Resolve the default cache location, honoring XDG_CACHE_HOME."""
+    cache_home = os.environ.get(
+        'XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')
+    )
+    return os.path.join(cache_home, 'delphyne_demos', 'roads')
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's content, empty if there is no such file."""
+    if not path or not os.path.isfile(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def road_cache_key(file_path, yaml_file_path, linear_tolerance, angular_tolerance, *extra):
+    """
+    Compute the cache key of a road.
+    Args:
+        file_path: road description file path
+        yaml_file_path: road rules file path, may be empty
+        linear_tolerance: linear tolerance the road is built with
+        angular_tolerance: angular tolerance the road is built with
+        extra: any other parameter the road is built with, e.g. its origin
+    Returns:
+        str: the cache key
+    """
+    return hashlib.sha256(":".join([
+        file_digest(file_path), file_digest(yaml_file_path),
+        repr(float(linear_tolerance)), repr(float(angular_tolerance))
+    ] + [str(value) for value in extra]).encode()).hexdigest()
+
+
+def describe_road_geometry(road_geometry):
+    """
+    Walk a road geometry to build its lane table.
+    Args:
+        road_geometry: a maliput road geometry
+    Returns:
+        list: [lane id, lane length] pairs for every lane
+    """
+    lanes = []
+    for i in range(road_geometry.num_junctions()):
+        junction = road_geometry.junction(i)
+        for j in range(junction.num_segments()):
+            segment = junction.segment(j)
+            for k in range(segment.num_lanes()):
+                lane = segment.lane(k)
+                lanes.append([lane.id().string(), lane.length()])
+    return lanes
+
+
+class RoadCache(object):
+    """
+    An on-disk cache of road descriptions, one JSON file per entry.
+    When more than `max_entries` are stored, the least recently used
+    ones are evicted.
+    """
+
+    def __init__(self, directory=None, max_entries=64):
+        self.directory = directory or get_default_cache_dir()
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    def get(self, key):
+        """
+        Look an entry up.
+        Args:
+            key: cache key, see road_cache_key()
+        Returns:
+            dict: the cached entry, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Track usage for eviction.
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        """
+        Store an entry, evicting the least recently used ones if need be.
+        Args:
+            key: cache key, see road_cache_key()
+            entry: a JSON serializable dict
+        """
+        # Write to a temporary file first, so that concurrent
+        # readers never see a partially written entry.
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temporary_path, self._path(key))
+        self.evict()
+
+    def entries(self):
+        """
+        List all cached entries.
+        Returns:
+            list: (key, entry) tuples, most recently used first
+        """
+        paths = [os.path.join(self.directory, name)
+                 for name in os.listdir(self.directory) if name.endswith('.json')]
+        paths.sort(key=os.path.getmtime, reverse=True)
+        entries = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    entries.append((os.path.basename(path)[:-len('.json')], json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def evict(self, max_entries=None):
+        """
+        Drop the least recently used entries beyond `max_entries`.
+        Args:
+            max_entries: entries to keep, the cache's own limit if None
+        """
+        if max_entries is None:
+            max_entries = self.max_entries
+        for key, _ in self.entries()[max_entries:]:
+            self.invalidate(key)
+
+    def invalidate(self, key):
+        """Drop an entry, if present."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def invalidate_file(self, file_path):
+        """
+        Drop all entries of a road or rules file.
+        Args:
+            file_path: road or rules file path
+        Returns:
+            int: the number of entries dropped
+        """
+        file_path = os.path.abspath(file_path)
+        dropped = 0
+        for key, entry in self.entries():
+            if file_path in (entry.get('file_path'), entry.get('yaml_file_path')):
+                self.invalidate(key)
+                dropped += 1
+        return dropped
+
+    def clear(self):
+        """Drop all entries."""
+        for key, _ in self.entries():
+            self.invalidate(key)
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Road Cache",
+            """
+Inspects and maintains the persistent cache of road descriptions
+used by the malidrive and MOBIL performance demos.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--cache-dir", default=None,
+        help="Cache location (default: {}).".format(get_default_cache_dir())
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("list", help="list cached roads")
+    invalidate_parser = subparsers.add_parser(
+        "invalidate", help="drop the entries of a road or rules file")
+    invalidate_parser.add_argument("file_path", help="road or rules file path")
+    evict_parser = subparsers.add_parser(
+        "evict", help="drop the least recently used entries")
+    evict_parser.add_argument("max_entries", type=int, help="number of entries to keep")
+    subparsers.add_parser("clear", help="drop all entries")
+    return parser.parse_args()
+
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    cache = RoadCache(args.cache_dir)
+    if args.command == "invalidate":
+        print("Dropped {} entries.".format(cache.invalidate_file(args.file_path)))
+    elif args.command == "evict":
+        cache.evict(args.max_entries)
+    elif args.command == "clear":
+        cache.clear()
+    else:
+        for key, entry in cache.entries():
+            print("{} {} (linear tolerance {}, angular tolerance {}): {} lanes".format(
+                key[:12], entry['file_path'], entry['linear_tolerance'],
+                entry['angular_tolerance'], len(entry['lanes'])))
@@ -39,11 +39,6 @@ Load a simulation with one of a few sample maliput road networks.
 import os
 import sys
 
-import delphyne.trees
-import delphyne.behaviours
-
-from delphyne_gui.utilities import launch_interactive_simulation
-
 from . import helpers
 
 ##############################################################################
@@ -134,6 +129,9 @@ $ {0} malidrive
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.behaviours
+    import delphyne.trees
+
     args = parse_arguments()
 
     if args.road_type == "dragway":
@@ -174,17 +172,6 @@ def main():
         sys.exit()
 
     tree_time_step = 0.02
-    with launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer"
+    )
@@ -43,22 +43,16 @@ Check the other examples in this directory for more advanced uses.
 # Imports
 ##############################################################################
 
+import functools
 import os.path
 
 import random
-import time
 
-import delphyne.trees
-import delphyne.behaviours
-import delphyne.blackboard
-import py_trees.behaviour
-import py_trees.blackboard
-import py_trees.common
-import py_trees.decorators
-
-import delphyne_gui.utilities
 
+from . import async_tick
 from . import helpers
+from . import instrumentation
+from . import resources
 
 ##############################################################################
 # Supporting Classes & Methods
@@ -74,78 +68,10 @@ This is a minimal example demonstrating the inclusion of a python
 callback (scriptlet) to be triggered at each tick of the simulation.
         """
     )
-    return parser.parse_args()
-
-
-class DelayedChangeSpeed(py_trees.behaviour.Behaviour):
-    """
-    Change speed of agent after 10 seconds have passed in simulation.
-    """
-
-    def __init__(self, agent_name, speed=1.0,
-                 name=py_trees.common.Name.AUTO_GENERATED):
-        super().__init__(name)
-        self.speed = speed
-        self.agent_name = agent_name
-
-    def initialise(self):
-        self.status = py_trees.common.Status.RUNNING
-
-    def late_setup(self, simulation):
-        self.simulation = simulation
-        self.agent = simulation.get_agent_by_name(self.agent_name)
-
-    def update(self):
-        if self.simulation.get_current_time() >= 10.0:
-            print("Speed up!")
-            self.agent.set_speed(self.speed)
-            self.status = py_trees.common.Status.SUCCESS
-        return self.status
-
-
-class SimulationStats(object):
-    """
-    This is a simple class to keep statistics of the simulation, just
-    averaging the time it takes to execute a simulation step from the outside
-    world. Every 1000 measures, the values are printed to stdout.
-    """
-
-    def __init__(self):
-        """Just init the stats"""
-        self.reset()
-        self._current_start_time = None
-
-    def reset(self):
-        """Clear all values"""
-        self._time_sum = 0.0
-        self._samples_count = 0
-        self._current_start_time = None
-
-    def print_stats(self):
-        """Print the stats"""
-        print(
-            "Average simulation step takes {delta}ms"
-            .format(delta=(self._time_sum / self._samples_count) * 1000))
-
-    def start(self):
-        """Record the time when we start measuring"""
-        self._current_start_time = time.time()
-
-    def record_tick(self):
-        """A simulation tick happened. Record it.
-        Every 1000 ticks print the stats and reset
-        """
-        end_time = time.time()
-        delta = end_time - self._current_start_time
-        self._time_sum += delta
-        self._samples_count += 1
-        if self._samples_count == 1000:
-            self.print_stats()
-            self.reset()
-        self.start()
-
-    def pos_tick_handler(self, behaviour_tree):
-        self.record_tick()
+    helpers.add_handler_budget_arguments(parser)
+    args = parser.parse_args()
+    helpers.check_handler_budget_arguments(parser, args)
+    return args
 
 
 def random_print(behaviour_tree):
@@ -158,14 +84,20 @@ def random_print(behaviour_tree):
 
 
 def create_scriptlets_scenario_subtree():
-    file_path = delphyne_gui.utilities.get_delphyne_gui_resource(
+    import delphyne.behaviours
+    import py_trees.common
+    import py_trees.decorators
+
+    from .behaviours.agents import DelayedChangeSpeed
+
+    file_path = resources.get_delphyne_gui_resource(
         'roads/circuit.yaml'
     )
 
     if not os.path.isfile(file_path):
         print("Required file {} not found."
               " Please, make sure to install the latest delphyne_gui."
-              .format(os.path.abspath(file_path)))
+              .format(file_path or 'roads/circuit.yaml'))
         quit()
 
     scenario_subtree = delphyne.behaviours.roads.Multilane(
@@ -197,6 +129,8 @@ def create_scriptlets_scenario_subtree():
 
 def main():
     """Keeping pylint entertained."""
+    import delphyne.trees
+
     args = parse_arguments()
 
     simulation_tree = delphyne.trees.BehaviourTree(
@@ -210,24 +144,19 @@ def main():
         logfile_name=args.logfile_name
     )
 
-    stats = SimulationStats()
-    simulation_tree.add_pre_tick_handler(random_print)
-    simulation_tree.add_post_tick_handler(stats.pos_tick_handler)
+    # Driven from an event loop, stats are reported by a side task
+    # every 20s rather than by the post tick handler every 1000 ticks.
+    stats = instrumentation.TickLatencyStats(report_every=0 if args.asyncio else 1000)
+    handlers = helpers.create_tick_handler_dispatcher(args)
+    handlers.add(random_print)
+    simulation_tree.add_pre_tick_handler(handlers)
+    simulation_tree.add_post_tick_handler(stats.post_tick_handler)
 
     tree_time_step = 0.02
-    with delphyne_gui.utilities.launch_interactive_simulation(
-        simulation_tree.runner, layout=args.layout, bare=args.bare, ign_visualizer="visualizer"
-    ) as launcher:
-        if args.duration < 0:
-            # run indefinitely
-            print("Running simulation indefinitely.")
-            stats.start()
-            simulation_tree.tick_tock(period=tree_time_step)
-        else:
-            # run for a finite time
-            print("Running simulation for {0} seconds.".format(args.duration))
-            stats.start()
-            simulation_tree.tick_tock(
-                period=tree_time_step, number_of_iterations=int(args.duration / tree_time_step)
-            )
-        launcher.terminate()
+    stats.start()
+    helpers.run_simulation(
+        simulation_tree, args, tree_time_step, ign_visualizer="visualizer",
+        tasks=[functools.partial(async_tick.every, 20., stats.print_stats)]
+    )
+    stats.print_stats()
+    handlers.print_stats()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Placement of agents over the lanes of a road network.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import bisect
+import functools
+import itertools
+import math
+import random
+
+from . import city
+from . import road_cache
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+
+def lane_direction(lane_id):
+    """
+    Whether traffic on a lane flows towards increasing s. maliput_malidrive
+    lane ids read <road>_<lane section>_<OpenDRIVE lane id> and, with right
+    hand traffic, lanes to the right of the reference line (negative
+    OpenDRIVE ids) flow along it. Lanes with ids of any other form are
+    assumed to flow towards increasing s.
+    """
+    try:
+        return int(lane_id.rsplit('_', 1)[1]) < 0
+    except (IndexError, ValueError):
+        return True
+
+
+class LaneIndex(object):
+    """
+    An index of the lanes of a road network, laid end to end, to place
+    agents over all of them at a cost independent of the network size.
+    Args:
+        lanes: [lane id, lane length] pairs, see road_cache.describe_road_geometry()
+    """
+
+    def __init__(self, lanes):
+        self.ids = [lane_id for lane_id, _ in lanes]
+        self.lengths = [length for _, length in lanes]
+        self.directions = [lane_direction(lane_id) for lane_id in self.ids]
+        self.starts = list(itertools.accumulate([0.] + self.lengths[:-1]))
+        self.total_length = sum(self.lengths)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def locate(self, distance):
+        """
+        Locate a distance along the lanes laid end to end.
+        Args:
+            distance: distance from the start of the first lane (m)
+        Returns:
+            tuple: the index of the lane the distance falls on, and the
+                   longitudinal position on that lane (m)
+        """
+        index = max(bisect.bisect_right(self.starts, distance) - 1, 0)
+        return index, distance - self.starts[index]
+
+    def distribute(self, num_agents):
+        """
+        Spread agents evenly over all lanes.
+        Args:
+            num_agents: number of agents to place
+        Returns:
+            list: (lane id, longitudinal position (m), direction of travel)
+                  tuples, one per agent
+        """
+        if self.total_length <= 0.:
+            raise ValueError("there are no lanes to place agents on")
+        spacing = self.total_length / num_agents
+        placements = []
+        for k in range(num_agents):
+            index, s = self.locate((k + 0.5) * spacing)
+            placements.append((self.ids[index], s, self.directions[index]))
+        return placements
+
+
+class LaneAgentsBatch(object):
+    """
+    A batch of agents spread evenly over the lanes of a road, placed all
+    at once when the first agent of the batch is set up, on the road
+    network being simulated. As agents are created before the road is
+    loaded, they all travel towards increasing s, and only lanes traffic
+    flows along that way (see lane_direction()) are used.
+    Args:
+        num_agents: number of agents in the batch
+        lane_table: callable returning the lane table of a road geometry,
+                    road_cache.describe_road_geometry() if None
+    """
+
+    def __init__(self, num_agents, lane_table=None):
+        self.num_agents = num_agents
+        self.lane_table = lane_table or road_cache.describe_road_geometry
+        self.placements = None
+
+    def __len__(self):
+        return self.num_agents
+
+    def lane_id(self, index):
+        """Lane id resolvable of the index-th agent of the batch."""
+        return functools.partial(self._lane_id, index=index)
+
+    def _lane_id(self, road_geometry, index):
+        if self.placements is None:
+            self.placements = self.resolve(road_geometry)
+        return self.placements[index][0]
+
+    def longitudinal_position(self, index):
+        """Longitudinal position resolvable of the index-th agent of the batch."""
+        return functools.partial(self._longitudinal_position, index=index)
+
+    def _longitudinal_position(self, road_geometry, lane_id, index):
+        if self.placements is None:
+            self.placements = self.resolve(road_geometry)
+        return self.placements[index][1]
+
+    def resolve(self, road_geometry):
+        """Resolve the placements of the whole batch, see LaneIndex.distribute()."""
+        lanes = [
+            lane for lane in self.lane_table(road_geometry)
+            if lane_direction(lane[0])
+        ]
+        return LaneIndex(lanes).distribute(self.num_agents)
+
+
+class SpawnError(RuntimeError):
+    """Raised when agents cannot be spawned as requested."""
+
+
+class SpawnAllocator(object):
+    """
+    Allocates spawn points over all lanes of a road, keeping a minimum
+    distance between any two of them, whichever agents they are for.
+    Candidate points are laid along every lane, as many as fit one
+    minimum distance apart, converted to inertial poses in one batch,
+    and visited in random order, keeping those
+    that clear all points kept so far. Kept points are hashed into a grid
+    of cells as wide as the minimum distance, so checking a candidate only
+    looks at the points in its cell and in the eight surrounding ones.
+    Candidates are checked in the plane, so points on neighbouring lanes,
+    which are usually closer than the minimum distance, exclude each other.
+
+    Spawn points are handed out as resolvables, and allocated all at once
+    when the first agent is set up, once the road geometry is available.
+    A request for more agents than the road holds fails the setup with a
+    SpawnError that tells how many it does hold.
+
+    Args:
+        num_agents: number of agents that will be spawned
+        min_distance: minimum distance between any two spawn points (m)
+        seed: seed of the order candidates are visited in
+        lane_table: callable returning the lane table of a road geometry,
+                    road_cache.describe_road_geometry() if None
+    """
+
+    def __init__(self, num_agents, min_distance, seed=1, lane_table=None):
+        self.num_agents = num_agents
+        self.min_distance = min_distance
+        self.seed = seed
+        self.lane_table = lane_table or road_cache.describe_road_geometry
+        self._grid = {}
+        self._spawns = None
+
+    def __len__(self):
+        return len(self._spawns) if self._spawns is not None else 0
+
+    def _cell(self, x, y):
+        return math.floor(x / self.min_distance), math.floor(y / self.min_distance)
+
+    def is_free(self, x, y):
+        """Whether a point keeps the minimum distance to all spawn points."""
+        i, j = self._cell(x, y)
+        min_distance_squared = self.min_distance * self.min_distance
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                for other_x, other_y in self._grid.get((i + di, j + dj), ()):
+                    if (x - other_x) ** 2 + (y - other_y) ** 2 < min_distance_squared:
+                        return False
+        return True
+
+    def candidates(self, road_geometry):
+        """
+        Lay candidate spawn points along all lanes of a road.
+        Args:
+            road_geometry: the road geometry to spawn on
+        Returns:
+            list: (lane id, longitudinal position (m)) tuples, in the
+                  order they are to be visited
+        """
+        candidates = []
+        for lane_id, length in self.lane_table(road_geometry):
+            count = int(length / self.min_distance)
+            candidates.extend(
+                (lane_id, (k + 0.5) * length / count) for k in range(count)
+            )
+        random.Random(self.seed).shuffle(candidates)
+        return candidates
+
+    def allocate(self, road_geometry):
+        """
+        Allocate the spawn points of all agents.
+        Args:
+            road_geometry: the road geometry to spawn on
+        Raises:
+            SpawnError: if the road does not hold that many agents
+        """
+        candidates = self.candidates(road_geometry)
+        x, y, heading = city.lane_positions_to_inertial_poses2d(
+            road_geometry, [lane_id for lane_id, _ in candidates],
+            [s for _, s in candidates])
+        spawns = []
+        for (lane_id, s), x, y, heading in zip(
+                candidates, x.tolist(), y.tolist(), heading.tolist()):
+            if self.is_free(x, y):
+                self._grid.setdefault(self._cell(x, y), []).append((x, y))
+                spawns.append((lane_id, s, x, y, heading))
+                if len(spawns) == self.num_agents:
+                    break
+        if len(spawns) < self.num_agents:
+            raise SpawnError(
+                "{} agents cannot be {}m apart on this road, only {} fit".format(
+                    self.num_agents, self.min_distance, len(spawns)))
+        self._spawns = spawns
+
+    def spawn(self, road_geometry, index):
+        """
+        Get the spawn point of an agent, allocating all of them on first request.
+        Args:
+            road_geometry: the road geometry to spawn on
+            index: index of the agent, in [0, num_agents)
+        Returns:
+            tuple: lane id, longitudinal position (m) and inertial x (m),
+                   y (m) and heading (rad)
+        """
+        if self._spawns is None:
+            self.allocate(road_geometry)
+        return self._spawns[index]
+
+    def lane_id(self, index):
+        """Lane id resolvable of the index-th agent."""
+        return lambda road_geometry: self.spawn(road_geometry, index)[0]
+
+    def longitudinal_position(self, index):
+        """Longitudinal position resolvable of the index-th agent."""
+        return lambda road_geometry, lane_id: self.spawn(road_geometry, index)[1]
+
+    def initial_pose(self, index):
+        """Initial inertial pose resolvable of the index-th agent."""
+        return lambda road_geometry: self.spawn(road_geometry, index)[2:]
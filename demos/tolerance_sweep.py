@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Sweeps the tolerances a well known road is built with, and recommends
+the loosest ones whose road stays within a requested accuracy of the
+road built with the tightest ones.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import itertools
+import sys
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import validate_roads
+from .mobil_perf_sweep import sweep_values
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+DEFAULT_LINEAR_TOLERANCES = '1e-3,2e-3,5e-3,1e-2,2e-2,5e-2,1e-1,2e-1,5e-1'
+
+
+def get_reference(reports):
+    """
+    Get the report of the tightest successful build, the one every other
+    build is measured against.
+    Args:
+        reports: road reports, see validate_roads.REPORT_FIELDS
+    Returns:
+        dict: the reference road report, None if no build succeeded
+    """
+    successes = [report for report in reports if not report['error']]
+    if not successes:
+        return None
+    return min(successes, key=lambda report: (
+        report['linear_tolerance'], report['angular_tolerance']))
+
+
+def get_deviation(report, reference):
+    """Total lane length deviation of a build from the reference build (m)."""
+    return report['lanes_length'] - reference['lanes_length']
+
+
+def recommend(reports, accuracy):
+    """
+    Pick the loosest tolerances whose build has as many lanes as the
+    reference build (see get_reference()) and a total lane length within
+    an accuracy of it, favoring the fastest build among equally loose ones.
+    Args:
+        reports: road reports, see validate_roads.REPORT_FIELDS
+        accuracy: largest acceptable total lane length deviation (m)
+    Returns:
+        dict: the recommended road report, None if there is none
+    """
+    reference = get_reference(reports)
+    if reference is None:
+        return None
+    candidates = [
+        report for report in reports
+        if not report['error'] and report['num_lanes'] == reference['num_lanes'] and
+        abs(get_deviation(report, reference)) <= accuracy
+    ]
+    return max(candidates, key=lambda report: (
+        report['linear_tolerance'], report['angular_tolerance'], -report['load_time']))
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Road Tolerance Sweep",
+            """
+Builds a well known road with every combination of the given linear and
+angular tolerances, each build in a worker process of its own, and
+reports build time, peak resident memory and whether the build succeeded.
+Total lane length deviations are measured against the tightest
+successful build. It then recommends the loosest tolerances whose build
+has as many lanes as that one, and deviates from it by no more than the
+requested accuracy.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "road", help="Well known road to be built, by name."
+    )
+    parser.add_argument(
+        "-B", "--backend", default="malidrive", choices=validate_roads.BACKENDS,
+        help="Backend the road is known to (default: malidrive)."
+    )
+    parser.add_argument(
+        "-l", "--linear-tolerances", default=sweep_values(float)(DEFAULT_LINEAR_TOLERANCES),
+        type=sweep_values(float),
+        help=("Linear tolerances to sweep (m), as a list or as a start:stop:step "
+              "range (default: {}).".format(DEFAULT_LINEAR_TOLERANCES))
+    )
+    parser.add_argument(
+        "-a", "--angular-tolerances", default=None, type=sweep_values(float),
+        help=("Angular tolerances to sweep (rad), as a list or as a start:stop:step "
+              "range (default: the road's own).")
+    )
+    parser.add_argument(
+        "--accuracy", required=True, type=float,
+        help="Largest acceptable total lane length deviation (m)."
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=1, type=int,
+        help=("Number of builds to run in parallel. Zero uses all available "
+              "cores. Parallel builds skew build times (default: 1)")
+    )
+    parser.add_argument(
+        "--timeout", default=600., type=float,
+        help="Time a build is allowed to take (sec) (default: 600s)."
+    )
+    parser.add_argument(
+        "-o", "--output", default="tolerance_sweep.jsonl",
+        help=("File to write the report to, as CSV if it has a .csv extension "
+              "and as JSON lines otherwise (default: tolerance_sweep.jsonl)")
+    )
+    args = parser.parse_args()
+    if args.road not in validate_roads.get_known_roads(args.backend):
+        parser.error("unknown {} road {}".format(args.backend, args.road))
+    return args
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    road = validate_roads.get_known_road(args.backend, args.road)
+    road_linear_tolerance = float(road['linear_tolerance'])
+    road_angular_tolerance = float(road['angular_tolerance'])
+    angular_tolerances = args.angular_tolerances or [road_angular_tolerance]
+    configs = [
+        (args.backend, args.road, linear_tolerance, angular_tolerance)
+        for linear_tolerance, angular_tolerance in itertools.product(
+            sorted(args.linear_tolerances), sorted(angular_tolerances))
+    ]
+
+    with benchmarking.RecordWriter(args.output, validate_roads.REPORT_FIELDS) as writer:
+        reports = []
+        for report in validate_roads.load_roads(configs, args.jobs, args.timeout):
+            writer.write(report)
+            reports.append(report)
+
+    reference = get_reference(reports)
+    print("{:>10} {:>10} {:>8} {:>10} {:>8} {:>12} {:>10}".format(
+        'linear', 'angular', 'load (s)', 'peak MiB', 'lanes', 'length (m)', 'deviation'))
+    for report in reports:
+        if report['error']:
+            print("{linear_tolerance:>10g} {angular_tolerance:>10g} FAILED: {error}".format(
+                **report))
+            continue
+        print("{:>10g} {:>10g} {:>8.2f} {:>10.1f} {:>8} {:>12.1f} {:>10.3f}".format(
+            report['linear_tolerance'], report['angular_tolerance'], report['load_time'],
+            report['peak_rss'], report['num_lanes'], report['lanes_length'],
+            get_deviation(report, reference)))
+
+    recommendation = recommend(reports, args.accuracy)
+    if recommendation is None:
+        print("No tolerances built {}.".format(args.road))
+        sys.exit(1)
+    print("Recommended for {}: linear_tolerance={:g}, angular_tolerance={:g} "
+          "({:.2f}s, {:.1f} MiB). Currently: linear_tolerance={:g}, "
+          "angular_tolerance={:g}.".format(
+              args.road, recommendation['linear_tolerance'],
+              recommendation['angular_tolerance'], recommendation['load_time'],
+              recommendation['peak_rss'], road_linear_tolerance, road_angular_tolerance))
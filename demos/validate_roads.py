@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# BSD 3-Clause License
+#
+# Copyright (c) 2022, Woven Planet. All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# * Redistributions of source code must retain the above copyright notice, this
+#   list of conditions and the following disclaimer.
+#
+# * Redistributions in binary form must reproduce the above copyright notice,
+#   this list of conditions and the following disclaimer in the documentation
+#   and/or other materials provided with the distribution.
+#
+# * Neither the name of the copyright holder nor the names of its
+#   contributors may be used to endorse or promote products derived from
+#   this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Loads every well known malidrive and maliput_osm road, each in a worker
+process of its own, and validates the resulting road networks.
+"""
+##############################################################################
+# Imports
+##############################################################################
+
+import argparse
+import collections
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+import delphyne.cmdline as cmdline
+
+from . import benchmarking
+from . import mali
+from . import mali_osm
+
+##############################################################################
+# Supporting Classes & Methods
+##############################################################################
+
+# Order in which report fields are written.
+REPORT_FIELDS = (
+    'backend',
+    'road',
+    'linear_tolerance',
+    'angular_tolerance',
+    'load_time',
+    'peak_rss',
+    'num_lanes',
+    'lanes_length',
+    'error',
+)
+
+BACKENDS = ('malidrive', 'maliput_osm')
+
+# How often to check on the pool while waiting for a road to load (s).
+POLL_PERIOD = 0.1
+
+
+def get_known_roads(backend):
+    """Names of the well known roads of a backend."""
+    if backend == 'malidrive':
+        return list(mali.KNOWN_ROADS)
+    return list(mali_osm.KNOWN_ROADS)
+
+
+def get_known_road(backend, road_name):
+    """Configuration of a well known road of a backend, see mali.get_known_road()."""
+    if backend == 'malidrive':
+        return mali.get_known_road(road_name)
+    return mali_osm.get_known_road(road_name)
+
+
+def create_road(backend, road_name, linear_tolerance=None, angular_tolerance=None):
+    """
+    Create the road behaviour of a well known road, as the demos do when
+    no one is watching.
+    Args:
+        backend: one of BACKENDS
+        road_name: name of the road among the backend's known roads
+        linear_tolerance: tolerance to build the road with, None for the road's own
+        angular_tolerance: tolerance to build the road with, None for the road's own
+    Returns:
+        tuple: the road behaviour, and the road configuration
+    """
+    road = get_known_road(backend, road_name)
+    if linear_tolerance is not None:
+        road['linear_tolerance'] = linear_tolerance
+    if angular_tolerance is not None:
+        road['angular_tolerance'] = angular_tolerance
+    if backend == 'malidrive':
+        return mali.create_malidrive_road(
+            road['file_path'], road['yaml_file_path'],
+            mali.create_road_features(headless=True),
+            road['linear_tolerance'], road['angular_tolerance']
+        ), road
+    return mali_osm.create_maliput_osm_road(
+        road['file_path'], road['origin'], road['yaml_file_path'],
+        mali_osm.create_road_features(headless=True),
+        road['linear_tolerance'], road['angular_tolerance']
+    ), road
+
+
+def load_road(config):
+    """
+    Load a well known road and describe the resulting road network.
+    Meant to be run in a process of its own, so that a road's peak RSS
+    is its own.
+    Args:
+        config: a (backend, road name) tuple, optionally followed by
+                the linear and angular tolerances to build the road with
+    Returns:
+        dict: the road report, see REPORT_FIELDS
+    """
+    import delphyne.trees
+
+    from .behaviours.roads import RoadCacheProbe
+
+    report = dict.fromkeys(REPORT_FIELDS)
+    report.update(zip(REPORT_FIELDS, config), error='')
+    try:
+        start = time.perf_counter()
+        scenario_subtree, road = create_road(*config)
+        report.update(linear_tolerance=float(road['linear_tolerance']),
+                      angular_tolerance=float(road['angular_tolerance']))
+        if not os.path.isfile(road['file_path']):
+            raise RuntimeError('road file not found')
+        probe = RoadCacheProbe(
+            None, road['file_path'], road['yaml_file_path'],
+            road['linear_tolerance'], road['angular_tolerance']
+        )
+        scenario_subtree.add_child(probe)
+        simulation_tree = delphyne.trees.BehaviourTree(root=scenario_subtree)
+        simulation_tree.setup(
+            realtime_rate=0., start_paused=True, log=False, logfile_name=''
+        )
+        report['load_time'] = time.perf_counter() - start
+        report['num_lanes'] = len(probe.lanes)
+        report['lanes_length'] = sum(length for _, length in probe.lanes)
+        if not probe.lanes:
+            raise RuntimeError('road network has no lanes')
+    except Exception as e:
+        report['error'] = traceback.format_exception_only(type(e), e)[-1].strip()
+    report['peak_rss'] = benchmarking.peak_rss()
+    return report
+
+
+def load_roads(configs, jobs=0, timeout=600.):
+    """
+    Load well known roads across a pool of worker processes, using a
+    fresh worker for every road. Roads are only handed to the pool as
+    workers become available, so that every road gets its full timeout
+    from the moment it is submitted.
+    Args:
+        configs: road configurations, see load_road()
+        jobs: number of worker processes, zero to use one per available core
+        timeout: time a road is allowed to take to load (s)
+    Returns:
+        iterator: road reports, in submission order
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count()
+    configs = iter(configs)
+    pending = collections.deque()
+    # Roads that timed out but still hold on to a worker.
+    stalled = []
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(jobs, maxtasksperchild=1) as pool:
+        while True:
+            stalled = [result for result in stalled if not result.ready()]
+            busy = len(stalled) + sum(not result.ready() for _, result, _ in pending)
+            # Even with every worker stalled, keeps at least one road going.
+            available = max(jobs - busy, 0 if pending else 1)
+            for config in itertools.islice(configs, available):
+                deadline = time.monotonic() + timeout
+                pending.append((config, pool.apply_async(load_road, (config,)), deadline))
+            if not pending:
+                break
+            config, result, deadline = pending[0]
+            # Wakes up now and then to keep idle workers busy.
+            result.wait(min(max(deadline - time.monotonic(), 0.), POLL_PERIOD))
+            if result.ready():
+                pending.popleft()
+                yield result.get()
+            elif time.monotonic() >= deadline:
+                # A worker that dies abruptly never delivers its result.
+                pending.popleft()
+                stalled.append(result)
+                report = dict.fromkeys(REPORT_FIELDS)
+                report.update(zip(REPORT_FIELDS, config),
+                              error='timed out, or the worker crashed')
+                yield report
+
+
+def parse_arguments():
+    "Argument passing and demo documentation."
+    parser = argparse.ArgumentParser(
+        description=cmdline.create_argparse_description(
+            "Road Validation",
+            """
+Loads the well known roads of the malidrive and maliput_osm demos
+across a pool of worker processes, a fresh one for every road, and
+reports load time, peak resident memory, lane count and total lane
+length of every road. Fails if any road fails to load.
+            """),
+        epilog=cmdline.create_argparse_epilog(),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "roads", nargs="*", metavar="road",
+        help="Roads to be loaded, by name (default: all well known roads)."
+    )
+    parser.add_argument(
+        "-B", "--backend", default="all", choices=BACKENDS + ("all",),
+        help="Backend whose roads are to be loaded (default: all)."
+    )
+    parser.add_argument(
+        "-j", "--jobs", default=0, type=int,
+        help=("Number of roads to load in parallel. Zero uses all available "
+              "cores (default: 0)")
+    )
+    parser.add_argument(
+        "--timeout", default=600., type=float,
+        help="Time a road is allowed to take to load (sec) (default: 600s)."
+    )
+    parser.add_argument(
+        "-o", "--output", default="validate_roads.jsonl",
+        help=("File to write the report to, as CSV if it has a .csv extension "
+              "and as JSON lines otherwise (default: validate_roads.jsonl)")
+    )
+    args = parser.parse_args()
+    backends = BACKENDS if args.backend == "all" else (args.backend,)
+    for name in args.roads:
+        if not any(name in get_known_roads(backend) for backend in backends):
+            parser.error("unknown road {}".format(name))
+    return args
+
+##############################################################################
+# Main
+##############################################################################
+
+
+def main():
+    """Keeping pylint entertained."""
+    args = parse_arguments()
+
+    backends = BACKENDS if args.backend == "all" else (args.backend,)
+    configs = [
+        (backend, road_name)
+        for backend in backends
+        for road_name in get_known_roads(backend)
+        if not args.roads or road_name in args.roads
+    ]
+
+    failures = 0
+    print("{:<12} {:<32} {:>8} {:>10} {:>8} {:>12}".format(
+        'backend', 'road', 'load (s)', 'peak MiB', 'lanes', 'length (m)'))
+    with benchmarking.RecordWriter(args.output, REPORT_FIELDS) as writer:
+        for report in load_roads(configs, args.jobs, args.timeout):
+            writer.write(report)
+            if report['error']:
+                failures += 1
+                print("{backend:<12} {road:<32} FAILED: {error}".format(**report))
+                continue
+            print("{backend:<12} {road:<32} {load_time:>8.2f} {peak_rss:>10.1f} "
+                  "{num_lanes:>8} {lanes_length:>12.1f}".format(**report))
+    print("{} roads loaded, {} failed. Report written to {}.".format(
+        len(configs), failures, args.output))
+    sys.exit(1 if failures else 0)